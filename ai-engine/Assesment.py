@@ -1,24 +1,11 @@
-import os
 import json
 import re
-import google.generativeai as genai
-from pathlib import Path
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
-from typing import List, Optional
-import uvicorn
-
-app = FastAPI()
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
-
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
-
-genai.configure(api_key=api_key)
+from provider_clients import gemini_request_options, get_gemini_model
+from rate_limiter import ProviderBusy
+import metrics
+from tracing import traced
 
+@traced("json.parse")
 def _extract_json(text: str) -> dict:
     """Extract JSON from Gemini response, handling markdown code blocks."""
     text = (text or "").strip()
@@ -29,15 +16,20 @@ def _extract_json(text: str) -> dict:
     match = re.search(r'```(?:json)?\s*(\{[\s\S]*\})\s*```', text)
     if match:
         try:
-            return json.loads(match.group(1))
+            parsed = json.loads(match.group(1))
+            metrics.JSON_PARSE_FALLBACKS.inc("_extract_json", "fenced")
+            return parsed
         except json.JSONDecodeError:
             pass
     match = re.search(r'\{[\s\S]*\}', text)
     if match:
         try:
-            return json.loads(match.group(0))
+            parsed = json.loads(match.group(0))
+            metrics.JSON_PARSE_FALLBACKS.inc("_extract_json", "braces")
+            return parsed
         except json.JSONDecodeError:
             pass
+    metrics.JSON_PARSE_FALLBACKS.inc("_extract_json", "failed")
     return {}
 
 
@@ -53,7 +45,7 @@ def generate_interview_assessment_with_gemini(
         safe_difficulty = "moderate"
     
     num_questions = max(1, int(noOfQuestions or 5))
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_gemini_model('gemini-2.5-flash')
     
     prompt = f"""
     You are an expert technical interviewer creating an assessment for {safe_role} role at {safe_company}.
@@ -62,7 +54,7 @@ def generate_interview_assessment_with_gemini(
     - Generate exactly {num_questions} multiple-choice questions (MCQs).
     - Cover these topics: {safe_topics}
     - Difficulty level: {safe_difficulty}
-    - Each question should have exactly 4 options.
+    - Each question should have exactly 4 options and exactly one correct option.
 
     OUTPUT FORMAT (STRICT JSON ONLY):
     {{
@@ -71,7 +63,9 @@ def generate_interview_assessment_with_gemini(
                 "id": 1,
                 "question": "Clear, concise question text here",
                 "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
-                "topic": "Specific topic covered by this question",
+                "answer": "The correct option, repeated exactly",
+                "explanation": "One sentence on why the answer is correct",
+                "topic": "The requested topic this question covers",
                 "difficulty": "{safe_difficulty}"
             }}
         ],
@@ -83,16 +77,19 @@ def generate_interview_assessment_with_gemini(
     try:
         response = model.generate_content(
             prompt,
-            generation_config=genai.GenerationConfig(
-                temperature=0.7,
-                response_mime_type="application/json",
-            )
+            generation_config={
+                "temperature": 0.7,
+                "response_mime_type": "application/json",
+            },
+            request_options=gemini_request_options(),
         )
         assessment = _extract_json(response.text)
         if not assessment.get("questions"):
             raise ValueError("Invalid response structure")
         return assessment
         
+    except ProviderBusy:
+        raise
     except Exception as e:
         print(f"Assessment generation error: {e}")
         return {"error": str(e)}
@@ -110,7 +107,7 @@ def assess_candidate_response_with_gemini(
     if not user_responses or not questions_asked:
         return {"error": "Missing user responses or questions"}
     
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    model = get_gemini_model('gemini-2.5-flash')
     
     prompt = f"""
     You are an expert technical interviewer assessing a candidate for {safe_role} at {safe_company}.
@@ -156,16 +153,77 @@ def assess_candidate_response_with_gemini(
     try:
         response = model.generate_content(
             prompt,
-            generation_config=genai.GenerationConfig(
-                temperature=0.7,
-                response_mime_type="application/json",
-            )
+            generation_config={
+                "temperature": 0.7,
+                "response_mime_type": "application/json",
+            },
+            request_options=gemini_request_options(),
         )
         assessment = _extract_json(response.text)
         if "overall_score" not in assessment:
             raise ValueError("Invalid assessment structure")
         return assessment
         
+    except ProviderBusy:
+        raise
     except Exception as e:
         print(f"Response assessment error: {e}")
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+def write_assessment_feedback_with_gemini(
+    *, company: str, role_name: str, topics: str, resume_summary: str, report: dict
+) -> dict:
+    """Narrative fields only; the scores in report come from the answer key."""
+    safe_company = (company or "Campus Connect").strip()
+    safe_role = (role_name or "Software Engineer").strip()
+    safe_topics = (topics or "General").strip()
+    safe_resume = (resume_summary or "No resume provided").strip()
+    results = [
+        {"question": item["question"], "candidate_answer": item["candidate_answer"], "is_correct": item["is_correct"]}
+        for item in report.get("detailed_analysis", [])
+    ]
+
+    model = get_gemini_model('gemini-2.5-flash')
+
+    prompt = f"""
+    You are an expert technical interviewer giving feedback on an MCQ assessment for {safe_role} at {safe_company}.
+
+    CONTEXT:
+    - Resume: {safe_resume}
+    - Topics: {safe_topics}
+    - Score: {report.get("correct_answers")}/{report.get("total_questions")} correct, per topic: {json.dumps(report.get("topic_scores", {}))}
+    - Graded answers: {json.dumps(results)}
+
+    The grading is final; do not re-grade. Write coaching feedback addressing the candidate as 'You'.
+
+    OUTPUT FORMAT (STRICT JSON ONLY):
+    {{
+        "strengths": ["Actionable strength"],
+        "improvements": ["Specific area to improve"],
+        "feedback": "Direct, encouraging coaching feedback."
+    }}
+    """
+
+    try:
+        response = model.generate_content(
+            prompt,
+            generation_config={
+                "temperature": 0.4,
+                "response_mime_type": "application/json",
+            },
+            request_options=gemini_request_options(),
+        )
+        narrative = _extract_json(response.text)
+        if not narrative.get("feedback"):
+            raise ValueError("Invalid feedback structure")
+        return {
+            "strengths": [str(item) for item in narrative.get("strengths") or []],
+            "improvements": [str(item) for item in narrative.get("improvements") or []],
+            "feedback": str(narrative["feedback"]),
+        }
+
+    except ProviderBusy:
+        raise
+    except Exception as e:
+        print(f"Assessment feedback error: {e}")
+        return {"error": str(e)}
@@ -0,0 +1,94 @@
+import re
+from typing import Any, Dict, List, Optional
+
+DIFFICULTY_WEIGHTS = {"basic": 1.0, "moderate": 1.5, "tough": 2.0}
+_LETTER = re.compile(r"^\(?([a-d])[\).:]?$")
+_NOISE = re.compile(r"[^a-z0-9+#.]+")
+
+
+def _normalize_answer(text: Any) -> str:
+    return " ".join(_NOISE.sub(" ", str(text or "").lower()).split())
+
+
+def _resolve_choice(response: Any, options: List[str]) -> str:
+    """Candidate answer as option text; accepts the text itself, a letter or a 0-based index."""
+    raw = str(response if response is not None else "").strip()
+    letter = _LETTER.match(raw.lower())
+    if letter and raw not in options:
+        index = ord(letter.group(1)) - ord("a")
+        if index < len(options):
+            return options[index]
+    if raw.isdigit() and raw not in options and int(raw) < len(options):
+        return options[int(raw)]
+    return raw
+
+
+def score_with_answer_key(
+    questions: List[Dict[str, Any]],
+    responses: List[Any],
+    keys: List[Optional[Dict[str, Any]]],
+    difficulty: str = "moderate",
+) -> Dict[str, Any]:
+    """
+    Deterministic report in the /assess_response schema, computed from the
+    stored answer key. Narrative fields get plain templated text; the
+    model-written versions are produced separately.
+    """
+    padded = list(responses) + [""] * (len(questions) - len(responses))
+    chosen = [_resolve_choice(response, question.get("options") or []) for question, response in zip(questions, padded)]
+    correct = [_normalize_answer(choice) == _normalize_answer(key["answer"]) for choice, key in zip(chosen, keys)]
+    answered = [bool(choice) for choice in chosen]
+
+    total = len(questions)
+    correct_count = sum(correct)
+    answered_count = sum(answered)
+    weights = [
+        DIFFICULTY_WEIGHTS.get(str(question.get("difficulty") or difficulty).lower(), DIFFICULTY_WEIGHTS["moderate"])
+        for question in questions
+    ]
+    weighted = sum(weight for weight, is_correct in zip(weights, correct) if is_correct)
+
+    topic_scores: Dict[str, Dict[str, int]] = {}
+    for question, is_correct in zip(questions, correct):
+        bucket = topic_scores.setdefault(question.get("topic") or "General", {"correct": 0, "total": 0})
+        bucket["total"] += 1
+        bucket["correct"] += int(is_correct)
+
+    strengths = [
+        f"You answered every {topic} question correctly ({score['correct']}/{score['total']})."
+        for topic, score in topic_scores.items() if score["correct"] == score["total"]
+    ]
+    improvements = [
+        f"Review {topic}: you got {score['correct']} of {score['total']} right."
+        for topic, score in topic_scores.items() if score["correct"] < score["total"]
+    ]
+    overall_score = round(100 * correct_count / total) if total else 0
+
+    return {
+        "overall_score": overall_score,
+        "correct_answers": correct_count,
+        "total_questions": total,
+        "detailed_analysis": [
+            {
+                "question": question.get("question", ""),
+                "candidate_answer": choice,
+                "correct_answer": key["answer"],
+                "is_correct": is_correct,
+                "solution": key.get("explanation") or "",
+            }
+            for question, choice, key, is_correct in zip(questions, chosen, keys, correct)
+        ],
+        "metrics": {
+            "technical_knowledge": round(100 * weighted / sum(weights)) if total else 0,
+            "accuracy": round(100 * correct_count / answered_count) if answered_count else 0,
+        },
+        "topic_scores": topic_scores,
+        "topics_covered": list(topic_scores),
+        "strengths": strengths,
+        "improvements": improvements,
+        "feedback": (
+            f"You answered {correct_count} of {total} questions correctly ({overall_score}%)."
+            + (f" You skipped {total - answered_count}." if answered_count < total else "")
+        ),
+        "scoring": "answer_key",
+    }
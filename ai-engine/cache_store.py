@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+
+DEFAULT_SQLITE_PATH = Path(__file__).parent / ".cache" / "ai_engine_cache.sqlite3"
+
+
+def make_cache_key(*parts: Any) -> str:
+    """Content-addressed key: SHA-256 of the JSON-encoded key parts."""
+    encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+EVICTION_POLICIES = {"lru", "fifo"}
+
+
+class MemoryCacheBackend:
+    """In-process store bounded by entry count, evicting LRU or FIFO."""
+
+    def __init__(self, max_entries: int = 256, eviction: str = "lru"):
+        self.max_entries = max(1, int(max_entries))
+        self.eviction = eviction if eviction in EVICTION_POLICIES else "lru"
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.eviction == "lru":
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(key, None) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    Local SQLite store that survives restarts. Values are stored as JSON and
+    evicted least-recently-used (or oldest-first for "fifo") once the table
+    exceeds max_entries.
+    """
+
+    def __init__(
+        self, table: str, path: str | Path = DEFAULT_SQLITE_PATH, max_entries: int = 1024, eviction: str = "lru"
+    ):
+        if not table.replace("_", "").isalnum():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self.max_entries = max(1, int(max_entries))
+        self.eviction = eviction if eviction in EVICTION_POLICIES else "lru"
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_access ON {table} (last_access)")
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self.eviction == "lru":
+                self._conn.execute(
+                    f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (time.time(), key)
+                )
+        return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float) -> int:
+        encoded = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, encoded, expires_at, now),
+            )
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            overflow = count - self.max_entries
+            if overflow > 0:
+                # Without LRU touches last_access is the insert time, so the
+                # same ordering gives FIFO eviction.
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+        return max(0, overflow)
+
+    def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute(f"SELECT key FROM {self.table}")]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+
+class ResponseCache:
+    """TTL cache over a pluggable backend, with hit/miss counters."""
+
+    def __init__(self, name: str, backend, ttl_sec: float):
+        self.name = name
+        self.backend = backend
+        self.ttl_sec = ttl_sec
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.writes = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        entry = self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        value, expires_at = entry
+        if expires_at <= time.time():
+            self.backend.delete(key)
+            self.expired += 1
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl_sec: float | None = None):
+        ttl = self.ttl_sec if ttl_sec is None else ttl_sec
+        self.evictions += self.backend.set(key, value, time.time() + ttl)
+        self.writes += 1
+
+    def delete(self, key: str) -> bool:
+        return self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def keys(self) -> List[str]:
+        """Every stored key, including entries that have expired but not been purged yet."""
+        return self.backend.keys()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "eviction": self.backend.eviction,
+            "entries": len(self.backend),
+            "ttl_sec": self.ttl_sec,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "writes": self.writes,
+        }
+
+
+_caches: Dict[str, ResponseCache] = {}
+
+
+def build_cache(name: str, *, env_prefix: str, default_ttl_sec: float, default_max_entries: int) -> ResponseCache:
+    """
+    Create and register a cache configured from the environment:
+    {PREFIX}_CACHE_BACKEND (memory|sqlite), {PREFIX}_CACHE_TTL_SEC,
+    {PREFIX}_CACHE_MAX_ENTRIES, {PREFIX}_CACHE_EVICTION (lru|fifo) and
+    {PREFIX}_CACHE_PATH.
+    """
+    backend_name = os.getenv(f"{env_prefix}_CACHE_BACKEND", "memory").strip().lower()
+    eviction = os.getenv(f"{env_prefix}_CACHE_EVICTION", "lru").strip().lower()
+    try:
+        ttl_sec = float(os.getenv(f"{env_prefix}_CACHE_TTL_SEC", default_ttl_sec))
+    except (TypeError, ValueError):
+        ttl_sec = default_ttl_sec
+    try:
+        max_entries = int(os.getenv(f"{env_prefix}_CACHE_MAX_ENTRIES", default_max_entries))
+    except (TypeError, ValueError):
+        max_entries = default_max_entries
+
+    if backend_name == "sqlite":
+        path = os.getenv(f"{env_prefix}_CACHE_PATH") or DEFAULT_SQLITE_PATH
+        backend = SQLiteCacheBackend(name, path=path, max_entries=max_entries, eviction=eviction)
+    else:
+        backend = MemoryCacheBackend(max_entries=max_entries, eviction=eviction)
+
+    cache = ResponseCache(name, backend, ttl_sec)
+    _caches[name] = cache
+    return cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {name: cache.stats() for name, cache in sorted(_caches.items())}
+
+
+def _collect_cache_metrics():
+    caches = sorted(_caches.items())
+    yield ("ai_engine_cache_hits_total", "counter", "Response cache hits",
+           [({"cache": name}, cache.hits) for name, cache in caches])
+    yield ("ai_engine_cache_misses_total", "counter", "Response cache misses, including expired entries",
+           [({"cache": name}, cache.misses) for name, cache in caches])
+    yield ("ai_engine_cache_evictions_total", "counter", "Response cache evictions",
+           [({"cache": name}, cache.evictions) for name, cache in caches])
+
+
+metrics.register_collector(_collect_cache_metrics)
@@ -0,0 +1,139 @@
+import io
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import metrics
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CAPTION_CACHE_TTL_SEC = _env_float("CAPTION_CACHE_TTL_SEC", 24 * 3600)
+CAPTION_CACHE_MAX_ENTRIES = int(_env_float("CAPTION_CACHE_MAX_ENTRIES", 2048))
+CAPTION_CACHE_MAX_DISTANCE = int(_env_float("CAPTION_CACHE_MAX_DISTANCE", 4))
+
+_HASH_SIZE = 8
+
+
+def perceptual_hash(data: bytes) -> int:
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    if image.format == "JPEG":
+        image.draft("L", (_HASH_SIZE * 8, _HASH_SIZE * 8))
+    return image_difference_hash(image)
+
+
+def image_difference_hash(image) -> int:
+    """
+    64-bit difference hash (dHash) of a 9x8 grayscale thumbnail. Re-encodes,
+    resizes and small edits of the same photo land within a few bits.
+    """
+    pixels = list(image.convert("L").resize((_HASH_SIZE + 1, _HASH_SIZE)).getdata())
+
+    value = 0
+    for row in range(_HASH_SIZE):
+        offset = row * (_HASH_SIZE + 1)
+        for column in range(_HASH_SIZE):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def _normalize_style(instruction: str) -> str:
+    return " ".join((instruction or "concise").split()).lower()
+
+
+class CaptionCache:
+    """
+    LRU/TTL caption store keyed by (style, perceptual hash). Lookups match
+    any entry of the same style within max_distance Hamming bits.
+    """
+
+    def __init__(self, max_entries: int, ttl_sec: float, max_distance: int):
+        self.max_entries = max(1, max_entries)
+        self.ttl_sec = ttl_sec
+        self.max_distance = max(0, max_distance)
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, image_hash: int, instruction: str) -> Optional[str]:
+        style = _normalize_style(instruction)
+        now = time.time()
+        with self._lock:
+            key = (style, image_hash)
+            entry = self._entries.get(key)
+            if entry is None and self.max_distance:
+                best = None
+                for (entry_style, entry_hash), candidate in self._entries.items():
+                    if entry_style != style or candidate[1] <= now:
+                        continue
+                    distance = (entry_hash ^ image_hash).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, (entry_style, entry_hash), candidate)
+                if best is not None:
+                    _, key, entry = best
+
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if key[1] == image_hash:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+            return entry[0]
+
+    def set(self, image_hash: int, instruction: str, caption: str):
+        with self._lock:
+            key = (_normalize_style(instruction), image_hash)
+            self._entries[key] = (caption, time.time() + self.ttl_sec)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.near_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "ttl_sec": self.ttl_sec,
+            "max_distance": self.max_distance,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+caption_cache = CaptionCache(CAPTION_CACHE_MAX_ENTRIES, CAPTION_CACHE_TTL_SEC, CAPTION_CACHE_MAX_DISTANCE)
+
+
+def caption_cache_stats() -> Dict[str, Any]:
+    return caption_cache.stats()
+
+
+def _collect_caption_cache_metrics():
+    yield ("ai_engine_caption_cache_lookups_total", "counter", "Caption cache lookups by result", [
+        ({"result": "exact_hit"}, caption_cache.exact_hits),
+        ({"result": "near_hit"}, caption_cache.near_hits),
+        ({"result": "miss"}, caption_cache.misses),
+    ])
+
+
+metrics.register_collector(_collect_caption_cache_metrics)
@@ -1,20 +1,35 @@
-import google.generativeai as genai
+import asyncio
+import json
 import os
-import base64
-import io
-import requests
-from PIL import Image
-from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Dict, List, Tuple
+from fastapi import HTTPException
+from cache_store import build_cache, make_cache_key
+from caption_cache import caption_cache
+from image_pipeline import prepare_image
+from provider_clients import gemini_request_options, get_gemini_model
+from provider_pool import run_provider_call
+from single_flight import coalesce
 
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
+try:
+    CAPTION_BATCH_IMAGES_PER_CALL = max(1, int(os.getenv("CAPTION_BATCH_IMAGES_PER_CALL", 6)))
+except (TypeError, ValueError):
+    CAPTION_BATCH_IMAGES_PER_CALL = 6
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
+_interview_prompt_cache = build_cache(
+    "interview_prompt",
+    env_prefix="INTERVIEW_PROMPT",
+    default_ttl_sec=6 * 3600,
+    default_max_entries=256,
+)
 
-genai.configure(api_key=api_key)
+
+def _normalize_prompt_key_part(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+
+def _normalize_topics_key(topics: str) -> str:
+    items = {_normalize_prompt_key_part(item) for item in topics.split(",")}
+    return ",".join(sorted(item for item in items if item))
 
 
 def generate_interview_prompt_with_gemini(
@@ -38,7 +53,18 @@ def generate_interview_prompt_with_gemini(
         if safe_difficulty not in {"basic", "moderate", "tough"}:
             safe_difficulty = "moderate"
 
-        model = genai.GenerativeModel("models/gemini-2.5-flash")
+        cache_key = make_cache_key(
+            _normalize_prompt_key_part(safe_company),
+            _normalize_prompt_key_part(safe_role),
+            _normalize_topics_key(safe_topics),
+            safe_difficulty,
+            _normalize_prompt_key_part(safe_resume),
+        )
+        cached_prompt = _interview_prompt_cache.get(cache_key)
+        if cached_prompt:
+            return cached_prompt
+
+        model = get_gemini_model("models/gemini-2.5-flash")
 
         request_prompt = f"""
 You are an expert prompt engineer.
@@ -74,63 +100,174 @@ Output rules:
 - Do NOT return explanation.
 """.strip()
 
-        response = model.generate_content(request_prompt)
+        response = model.generate_content(request_prompt, request_options=gemini_request_options())
         generated_prompt = (response.text or "").strip()
 
         if not generated_prompt:
             raise ValueError("Gemini returned an empty prompt")
 
+        _interview_prompt_cache.set(cache_key, generated_prompt)
         return generated_prompt
     except Exception as e:
         print(f"Gemini Interview Prompt Error: {e}")
         raise
 
-def process_image_with_gemini(image_input: str, instruction: str = "concise"):
+def _caption_prompt(instruction: str) -> str:
+    return (
+        "Act as a Gen Z social media user. "
+        f"Write a caption that is {instruction}. "
+        "RULES: Max 20 words, use emojis, NO visual description (don't say 'I see' or 'This is'), "
+        "write as if you are in the photo or took it."
+    )
+
+
+def caption_image_bytes(data: bytes, mime_type: str, instruction: str = "concise"):
+    """Caption already-encoded image bytes; the bytes go to Gemini as-is."""
+    model = get_gemini_model('models/gemini-2.5-flash')
+    response = model.generate_content(
+        [_caption_prompt(instruction), {"mime_type": mime_type, "data": data}],
+        request_options=gemini_request_options(),
+    )
+    return response.text
+
+
+async def process_image_with_gemini(image_input: str, instruction: str = "concise"):
     """
-    Handles Image Captioning using Gemini 1.5 Flash.
-    Optimized for speed with image resizing.
+    Handles Image Captioning using Gemini 2.5 Flash.
+    The image is fetched asynchronously and resized off the event loop.
+    Concurrent requests for the same image share one fetch and one
+    Gemini call.
     """
     try:
-        image_pil = None
-        if image_input.startswith(('http://', 'https://')):
-            response = requests.get(image_input)
-            response.raise_for_status()
-            image_pil = Image.open(io.BytesIO(response.content))
-        else:
-            if "," in image_input:
-                image_input = image_input.split(",")[1]
-            
-            image_input = image_input.strip().replace("\n", "").replace(" ", "")
-            missing_padding = len(image_input) % 4
-            if missing_padding:
-                image_input += '=' * (4 - missing_padding)
-
-            decoded_bytes = base64.b64decode(image_input)
-            image_pil = Image.open(io.BytesIO(decoded_bytes))
-
-        if not image_pil:
-            raise ValueError("Could not process image data.")
-
-        if image_pil.mode != 'RGB':
-            image_pil = image_pil.convert('RGB')
-        
-        image_pil.thumbnail((800, 800))
-        
-        img_byte_arr = io.BytesIO()
-        image_pil.save(img_byte_arr, format='JPEG', quality=70)
-        final_image = Image.open(img_byte_arr)
-        model = genai.GenerativeModel('models/gemini-2.5-flash')
-
-        prompt = (
-            "Act as a Gen Z social media user. "
-            f"Write a caption that is {instruction}. "
-            "RULES: Max 20 words, use emojis, NO visual description (don't say 'I see' or 'This is'), "
-            "write as if you are in the photo or took it."
+        return await coalesce(
+            "caption_input",
+            make_cache_key(image_input.strip(), _normalize_prompt_key_part(instruction)),
+            lambda: _caption_image_input(image_input, instruction),
         )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise RuntimeError("Gemini image processing failed") from e
 
-        response = model.generate_content([prompt, final_image])
-        
-        return response.text
 
-    except Exception as e:
-        raise RuntimeError("Gemini image processing failed") from e
\ No newline at end of file
+async def _caption_image_input(image_input: str, instruction: str) -> str:
+    image = await prepare_image(image_input)
+    cached_caption = caption_cache.get(image.perceptual_hash, instruction)
+    if cached_caption is not None:
+        return cached_caption
+
+    # The same picture often arrives under different URLs or encodings.
+    caption = await coalesce(
+        "caption_image",
+        make_cache_key(image.perceptual_hash, _normalize_prompt_key_part(instruction)),
+        lambda: run_provider_call("gemini", caption_image_bytes, image.data, image.mime_type, instruction),
+    )
+    caption_cache.set(image.perceptual_hash, instruction, caption)
+    return caption
+
+
+def _caption_batch_prompt(count: int) -> str:
+    return (
+        "Act as a Gen Z social media user. "
+        f"You will receive {count} numbered images, each with its own caption style. "
+        "Write one caption per image in that image's style. "
+        "RULES: Max 20 words each, use emojis, NO visual description (don't say 'I see' or 'This is'), "
+        "write as if you are in the photo or took it. "
+        'Return JSON only: {"captions": [{"index": 1, "caption": "..."}]}'
+    )
+
+
+def caption_image_group(images: List[Tuple[bytes, str, str]]) -> Dict[int, str]:
+    """
+    Caption several (bytes, mime_type, instruction) images in one multimodal
+    call. Returns captions by position; images the model skipped are absent.
+    """
+    if len(images) == 1:
+        data, mime_type, instruction = images[0]
+        return {0: caption_image_bytes(data, mime_type, instruction)}
+
+    parts: List[Any] = [_caption_batch_prompt(len(images))]
+    for number, (data, mime_type, instruction) in enumerate(images, start=1):
+        parts.append(f"Image {number} (style: {instruction}):")
+        parts.append({"mime_type": mime_type, "data": data})
+
+    model = get_gemini_model('models/gemini-2.5-flash')
+    response = model.generate_content(
+        parts,
+        generation_config={"response_mime_type": "application/json"},
+        request_options=gemini_request_options(),
+    )
+    payload = json.loads(response.text or "{}")
+
+    captions: Dict[int, str] = {}
+    for item in payload.get("captions", []) if isinstance(payload, dict) else []:
+        try:
+            position = int(item.get("index")) - 1
+        except (AttributeError, TypeError, ValueError):
+            continue
+        caption = str(item.get("caption") or "").strip()
+        if 0 <= position < len(images) and caption:
+            captions[position] = caption
+    return captions
+
+
+async def caption_images_batch(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Caption many (image_input, instruction) pairs. Images are prepared
+    concurrently, repeats within the batch and cache hits are answered
+    directly, and the rest are packed CAPTION_BATCH_IMAGES_PER_CALL at a time
+    into Gemini calls. Failures are reported per image.
+    """
+    prepared = await asyncio.gather(*(prepare_image(image) for image, _ in items), return_exceptions=True)
+    results: List[Dict[str, Any]] = [{} for _ in items]
+    pending: List[int] = []
+    duplicates: Dict[int, int] = {}
+    first_by_key: Dict[Tuple[int, str], int] = {}
+
+    for index, ((_, instruction), image) in enumerate(zip(items, prepared)):
+        if isinstance(image, BaseException):
+            detail = image.detail if isinstance(image, HTTPException) else "Could not process image data."
+            results[index] = {"status": "error", "detail": detail}
+            continue
+        key = (image.perceptual_hash, " ".join(instruction.split()).lower())
+        if key in first_by_key:
+            duplicates[index] = first_by_key[key]
+            continue
+        first_by_key[key] = index
+        cached_caption = caption_cache.get(image.perceptual_hash, instruction)
+        if cached_caption is not None:
+            results[index] = {"status": "success", "caption": cached_caption}
+        else:
+            pending.append(index)
+
+    groups = [
+        pending[start:start + CAPTION_BATCH_IMAGES_PER_CALL]
+        for start in range(0, len(pending), CAPTION_BATCH_IMAGES_PER_CALL)
+    ]
+    group_results = await asyncio.gather(
+        *(
+            run_provider_call(
+                "gemini",
+                caption_image_group,
+                [(prepared[index].data, prepared[index].mime_type, items[index][1]) for index in group],
+            )
+            for group in groups
+        ),
+        return_exceptions=True,
+    )
+
+    for group, captions in zip(groups, group_results):
+        if isinstance(captions, BaseException):
+            print(f"Gemini batch caption error: {captions}")
+            captions = {}
+        for position, index in enumerate(group):
+            caption = captions.get(position)
+            if caption is None:
+                results[index] = {"status": "error", "detail": "Caption generation failed."}
+                continue
+            caption_cache.set(prepared[index].perceptual_hash, items[index][1], caption)
+            results[index] = {"status": "success", "caption": caption}
+
+    for index, original in duplicates.items():
+        results[index] = dict(results[original])
+    return results
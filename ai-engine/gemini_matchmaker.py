@@ -1,22 +1,29 @@
-import os
 import json
-import google.generativeai as genai
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+from provider_clients import gemini_request_options, get_gemini_model
+from matchmaker_cache import get_cached_filters, store_cached_filters
+from matchmaker_rules import LOCAL_CONFIDENCE_THRESHOLD, extract_filters_locally, has_any_filter, record_resolution
 
 generation_config = {
   "temperature": 0.0, # Zero hallucination
   "response_mime_type": "application/json", # Native JSON Enforcement!
 }
-model = genai.GenerativeModel('gemini-1.5-flash', generation_config=generation_config)
 
 def filter_fields_generator(user_input: str, user_profile: dict = None):
+    local_filters, confidence = extract_filters_locally(user_input, user_profile)
+    if confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+        record_resolution(True)
+        return local_filters
+    record_resolution(False)
+
     try:
         profile = user_profile or {}
         my_campus = profile.get("campus", "UIT")
         my_branch = profile.get("branch", "Computer Science and Engineering")
         
         query_lower = user_input.lower()
+        cached_filters = get_cached_filters("gemini", user_input)
+        if cached_filters is not None:
+            return cached_filters
 
         system_prompt = f"""
 You are a teammate matchmaker API. Extract the requirements from the user's query into a strict JSON format.
@@ -39,13 +46,18 @@ Output EXACTLY this JSON structure:
   "status_any": "any"
 }}
 """
-        response = model.generate_content(system_prompt)
+        model = get_gemini_model('gemini-1.5-flash', generation_config=generation_config)
+        response = model.generate_content(system_prompt, request_options=gemini_request_options())
         
         parsed_data = json.loads(response.text) 
+        store_cached_filters("gemini", user_input, "", parsed_data)
         return parsed_data
 
     except Exception as e:
         print(f"Matchmaker Error: {e}")
+        # Low-confidence local result still beats an empty fallback during outages
+        if has_any_filter(local_filters):
+            return local_filters
         # Fallback dictionary
         return {
             "strict_filters": {"campus": "", "branch": "", "batch": ""},
@@ -1,27 +1,157 @@
+import asyncio
+import hashlib
+import io
 import os
-import fitz
-import google.generativeai as genai
-from fastapi import UploadFile
+import tempfile
+from fastapi import HTTPException, UploadFile
+from cache_store import build_cache
+from provider_clients import gemini_request_options, get_gemini_model
+from provider_pool import run_provider_call
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel('models/gemini-2.5-flash')
 
-async def process_resume_analysis(file: UploadFile):
-    pdf_content = await file.read()
-    
-    text = ""
-    with fitz.open(stream=pdf_content, filetype="pdf") as doc:
-        for page in doc:
-            text += page.get_text()
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+RESUME_MAX_BYTES = _env_int("RESUME_MAX_BYTES", 10 * 1024 * 1024)
+RESUME_MAX_PAGES = _env_int("RESUME_MAX_PAGES", 20)
+RESUME_MAX_CHARS = _env_int("RESUME_MAX_CHARS", 24000)
+RESUME_SPOOL_THRESHOLD = _env_int("RESUME_SPOOL_THRESHOLD", 1024 * 1024)
+_READ_CHUNK = 64 * 1024
+
+# Keyed by the SHA-256 of the uploaded bytes; stores the extracted text and
+# the Gemini briefing so repeat uploads skip both.
+_resume_cache = build_cache(
+    "resume_analysis",
+    env_prefix="RESUME",
+    default_ttl_sec=7 * 24 * 3600,
+    default_max_entries=512,
+)
+
+
+class _SpooledPdf:
+    """Upload held in memory when small, or in a temp file once it grows."""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.path = None
+        self._handle = None
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+
+    @property
+    def content_hash(self) -> str:
+        return self.sha256.hexdigest()
+
+    async def write(self, chunk: bytes):
+        self.size += len(chunk)
+        self.sha256.update(chunk)
+        if self._handle is None and self.size > RESUME_SPOOL_THRESHOLD:
+            self._handle = tempfile.NamedTemporaryFile(prefix="resume-", suffix=".pdf", delete=False)
+            self.path = self._handle.name
+            await asyncio.to_thread(self._handle.write, self.buffer.getvalue())
+            self.buffer = None
+        if self._handle is not None:
+            await asyncio.to_thread(self._handle.write, chunk)
+        else:
+            self.buffer.write(chunk)
+
+    def finish(self):
+        if self._handle is not None:
+            self._handle.close()
+
+    def open_document(self):
+        import fitz
+
+        if self.path:
+            return fitz.open(self.path)
+        return fitz.open(stream=self.buffer.getvalue(), filetype="pdf")
+
+    def cleanup(self):
+        self.finish()
+        if self.path:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+async def _spool_upload(file: UploadFile) -> _SpooledPdf:
+    spooled = _SpooledPdf()
+    try:
+        while True:
+            chunk = await file.read(_READ_CHUNK)
+            if not chunk:
+                break
+            if spooled.size + len(chunk) > RESUME_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Resume PDF is too large.")
+            await spooled.write(chunk)
+        spooled.finish()
+        return spooled
+    except BaseException:
+        spooled.cleanup()
+        raise
+
+
+def _extract_resume_text(spooled: _SpooledPdf) -> str:
+    # MuPDF is not safe to drive from several threads, even with one handle
+    # each, so pages are read in order on one worker and reading stops as
+    # soon as the prompt has enough text.
+    parts = []
+    collected = 0
+    with spooled.open_document() as doc:
+        for page in doc.pages(0, min(doc.page_count, RESUME_MAX_PAGES)):
+            text = page.get_text()
+            parts.append(text)
+            collected += len(text)
+            if collected >= RESUME_MAX_CHARS:
+                break
+    return "".join(parts)[:RESUME_MAX_CHARS]
+
+
+async def process_resume_analysis(file: UploadFile) -> dict:
+    spooled = await _spool_upload(file)
+    content_hash = spooled.content_hash
+    try:
+        cached = _resume_cache.get(content_hash) or {}
+        if cached.get("overview"):
+            return {"overview": cached["overview"], "content_hash": content_hash, "cached": True}
+
+        text = cached.get("text")
+        if text is None:
+            text = await asyncio.to_thread(_extract_resume_text, spooled)
+    finally:
+        spooled.cleanup()
 
     if not text.strip():
-        return "Could not extract text from this document."
+        overview = "Could not extract text from this document."
+    else:
+        # Keep the extracted text even if the briefing call below fails.
+        _resume_cache.set(content_hash, {"text": text, "overview": None})
+        overview = await run_provider_call("gemini", _generate_resume_briefing, text)
 
+    _resume_cache.set(content_hash, {"text": text, "overview": overview})
+    return {"overview": overview, "content_hash": content_hash, "cached": False}
+
+
+def invalidate_resume_cache(content_hash: str | None = None) -> int:
+    """Drop one cached resume by content hash, or every entry when no hash is given."""
+    if content_hash is None:
+        removed = len(_resume_cache.backend)
+        _resume_cache.clear()
+        return removed
+    return 1 if _resume_cache.delete(content_hash.strip().lower()) else 0
+
+
+def _generate_resume_briefing(text: str):
     prompt = f"""
     You are an AI Interviewer preparing for a call. Analyze this resume:
-    
+
     {text}
-    
+
     Provide a concise candidate briefing:
     - Experience Level & Primary Role
     - Top Technical Skills
@@ -29,5 +159,6 @@ async def process_resume_analysis(file: UploadFile):
     - Suggested 'deep-dive' topics for this interview
     """
 
-    response = model.generate_content(prompt)
-    return response.text
\ No newline at end of file
+    model = get_gemini_model('models/gemini-2.5-flash')
+    response = model.generate_content(prompt, request_options=gemini_request_options())
+    return response.text
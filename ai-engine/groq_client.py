@@ -1,18 +1,15 @@
-import os
 import re
 import json
-from groq import Groq
-from dotenv import load_dotenv
+import metrics
+from tracing import traced
+from provider_clients import CHAT_MODEL, get_groq_client
+from matchmaker_cache import get_cached_filters, store_cached_filters
+from matchmaker_rules import LOCAL_CONFIDENCE_THRESHOLD, extract_filters_locally, has_any_filter, record_resolution
 
-load_dotenv()
-
-api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=api_key)
-CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
 
 def chatbot(user_input: str):
     try:
-        completion = client.chat.completions.create(
+        completion = get_groq_client().chat.completions.create(
             model=CHAT_MODEL,
             messages=[
                 {"role": "system", "content": "You are a Gen Z AI assistant. Reply in Hinglish, max 2 sentences."},
@@ -24,6 +21,7 @@ def chatbot(user_input: str):
     except Exception as e:
         raise RuntimeError("Groq chat request failed") from e
 
+@traced("json.parse")
 def _extract_json_object(text: str):
     if not text:
         return None
@@ -31,17 +29,22 @@ def _extract_json_object(text: str):
     fenced = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", text, re.IGNORECASE)
     if fenced:
         try:
-            return json.loads(fenced.group(1))
+            parsed = json.loads(fenced.group(1))
+            metrics.JSON_PARSE_FALLBACKS.inc("_extract_json_object", "fenced")
+            return parsed
         except Exception:
             pass
 
     direct = re.search(r"\{[\s\S]*\}", text)
     if direct:
         try:
-            return json.loads(direct.group(0))
+            parsed = json.loads(direct.group(0))
+            metrics.JSON_PARSE_FALLBACKS.inc("_extract_json_object", "braces")
+            return parsed
         except Exception:
-            return None
+            pass
 
+    metrics.JSON_PARSE_FALLBACKS.inc("_extract_json_object", "failed")
     return None
 
 
@@ -80,6 +83,12 @@ def _normalized_filters(payload: dict):
     }
 
 def filter_fields_generator(user_input: str, user_profile: dict = None):
+    local_filters, confidence = extract_filters_locally(user_input, user_profile)
+    if confidence >= LOCAL_CONFIDENCE_THRESHOLD:
+        record_resolution(True)
+        return local_filters
+    record_resolution(False)
+
     try:
         profile = user_profile or {}
         my_campus = profile.get("campus", "UIT")
@@ -94,6 +103,10 @@ def filter_fields_generator(user_input: str, user_profile: dict = None):
         if any(word in query_lower for word in ["apna college", "mera college", "same college", "apne campus"]):
             injected_context += f" [System Rule: You MUST set the 'campus' field strictly to '{my_campus}'.] "
 
+        cached_filters = get_cached_filters("groq", user_input, injected_context)
+        if cached_filters is not None:
+            return cached_filters
+
         smart_user_input = user_input + injected_context
 
         system_prompt = """
@@ -116,7 +129,7 @@ Output EXACTLY this JSON structure:
 }
 """
 
-        completion = client.chat.completions.create(
+        completion = get_groq_client().chat.completions.create(
             model=CHAT_MODEL,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -129,11 +142,15 @@ Output EXACTLY this JSON structure:
 
         response = completion.choices[0].message.content
         parsed_data = json.loads(response) 
+        store_cached_filters("groq", user_input, injected_context, parsed_data)
         
         return parsed_data
 
     except Exception as e:
         print(f"Error: {e}")
+        # Low-confidence local result still beats an empty fallback during outages
+        if has_any_filter(local_filters):
+            return local_filters
         return {
             "strict_filters": {"campus": "", "branch": "", "batch": ""},
             "scoring_filters": {"skills_any": [], "interests_any": [], "looking_for_any": []},
@@ -1,14 +1,8 @@
-import os
 import json
 import re
-from groq import Groq
-from dotenv import load_dotenv
-
-load_dotenv()
-
-api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=api_key)
-CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
+import metrics
+from tracing import traced
+from provider_clients import CHAT_MODEL, get_groq_client
 
 def get_system_prompt(company, role, topics, resume_summary, interview_summary, difficulty="moderate"):
     # Difficulty-specific guidance
@@ -84,6 +78,7 @@ def get_system_prompt(company, role, topics, resume_summary, interview_summary,
     """
 
 
+@traced("json.parse")
 def _safe_parse_json(content):
     if not content:
         return None
@@ -96,9 +91,12 @@ def _safe_parse_json(content):
     match = re.search(r"\{[\s\S]*\}", content)
     if match:
         try:
-            return json.loads(match.group(0))
+            parsed = json.loads(match.group(0))
+            metrics.JSON_PARSE_FALLBACKS.inc("_safe_parse_json", "braces")
+            return parsed
         except Exception:
-            return None
+            pass
+    metrics.JSON_PARSE_FALLBACKS.inc("_safe_parse_json", "failed")
     return None
     
 def Interviewer(user_input, chat_history=None, company=None, role=None, topics=None, resume_summary="No resume provided", interview_summary="No interview history", interview_duration_sec=0, max_interview_duration_sec=900, difficulty="moderate"):
@@ -137,7 +135,7 @@ def Interviewer(user_input, chat_history=None, company=None, role=None, topics=N
 
     messages = [system_message] + recent_history + [{"role": "user", "content": user_input}]
 
-    completion = client.chat.completions.create(
+    completion = get_groq_client().chat.completions.create(
         model=CHAT_MODEL,
         messages=messages,
         temperature=0.6,
@@ -0,0 +1,113 @@
+import asyncio
+import base64
+import binascii
+import io
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from fastapi import HTTPException
+
+from caption_cache import image_difference_hash, perceptual_hash
+from provider_clients import get_async_http_client
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+IMAGE_MAX_BYTES = _env_int("IMAGE_MAX_BYTES", 15 * 1024 * 1024)
+IMAGE_MAX_DIMENSION = _env_int("IMAGE_MAX_DIMENSION", 800)
+IMAGE_PASSTHROUGH_BYTES = _env_int("IMAGE_PASSTHROUGH_BYTES", 512 * 1024)
+IMAGE_JPEG_QUALITY = _env_int("IMAGE_JPEG_QUALITY", 70)
+
+_PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    perceptual_hash: Optional[int] = None
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail="Image is too large.")
+
+
+async def _fetch_image(url: str) -> bytes:
+    client = get_async_http_client()
+    async with client.stream("GET", url, follow_redirects=True) as response:
+        response.raise_for_status()
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > IMAGE_MAX_BYTES:
+            raise _too_large()
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > IMAGE_MAX_BYTES:
+                raise _too_large()
+    return bytes(body)
+
+
+def _decode_base64_image(image_input: str) -> bytes:
+    if "," in image_input:
+        image_input = image_input.split(",")[1]
+
+    image_input = image_input.strip().replace("\n", "").replace(" ", "")
+    if len(image_input) * 3 // 4 > IMAGE_MAX_BYTES:
+        raise _too_large()
+    missing_padding = len(image_input) % 4
+    if missing_padding:
+        image_input += '=' * (4 - missing_padding)
+
+    try:
+        return base64.b64decode(image_input)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError("Could not process image data.") from e
+
+
+async def load_image_bytes(image_input: str) -> bytes:
+    """Raw bytes for an http(s) URL or a (data-URL) base64 string."""
+    if image_input.startswith(('http://', 'https://')):
+        return await _fetch_image(image_input)
+    return await asyncio.to_thread(_decode_base64_image, image_input)
+
+
+def prepare_caption_image(data: bytes) -> PreparedImage:
+    """
+    Shrink an image for captioning. Small JPEG/PNG/WebP files are passed
+    through untouched; anything else is decoded once (JPEGs in draft mode
+    at a reduced scale), thumbnailed and re-encoded as JPEG.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    mime_type = _PASSTHROUGH_FORMATS.get(image.format or "")
+    fits = max(width, height) <= IMAGE_MAX_DIMENSION
+    if mime_type and fits and len(data) <= IMAGE_PASSTHROUGH_BYTES:
+        return PreparedImage(data, mime_type, width, height, perceptual_hash(data))
+
+    target = (IMAGE_MAX_DIMENSION, IMAGE_MAX_DIMENSION)
+    if image.format == "JPEG":
+        image.draft("RGB", target)
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.thumbnail(target)
+
+    encoded = io.BytesIO()
+    image.save(encoded, format='JPEG', quality=IMAGE_JPEG_QUALITY)
+    return PreparedImage(
+        encoded.getvalue(), "image/jpeg", image.width, image.height, image_difference_hash(image)
+    )
+
+
+async def prepare_image(image_input: str) -> PreparedImage:
+    data = await load_image_bytes(image_input)
+    return await asyncio.to_thread(prepare_caption_image, data)
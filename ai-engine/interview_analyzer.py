@@ -1,18 +1,23 @@
-import os
+import asyncio
 import json
-import google.generativeai as genai
-from pathlib import Path
-from dotenv import load_dotenv
+import os
+import re
+from provider_clients import gemini_request_options, get_gemini_model
+from provider_pool import run_provider_call
+from rate_limiter import ProviderBusy
+from tracing import span
+
 
-env_path = Path(__file__).parent / ".env"
-load_dotenv(dotenv_path=env_path)
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
 
-api_key = os.getenv("GEMINI_API_KEY")
-if not api_key:
-    raise ValueError("GEMINI_API_KEY not found in .env file")
 
-genai.configure(api_key=api_key)
-model = genai.GenerativeModel('models/gemini-2.5-flash')
+ANALYSIS_CHUNK_CHARS = _env_int("INTERVIEW_ANALYSIS_CHUNK_CHARS", 6000)
+ANALYSIS_PARALLELISM = _env_int("INTERVIEW_ANALYSIS_PARALLELISM", 4)
+METRICS = ("technical", "behavioral", "communication", "problem_solving", "company_knowledge")
 
 def analyze_interview_with_gemini(
     transcript: list,
@@ -22,10 +27,7 @@ def analyze_interview_with_gemini(
     resume_summary: str = "No resume provided",
     interview_duration_sec: int = 0
 ) -> dict:
-    transcript_text = "\n".join([
-        f"{item.get('speaker', 'Unknown')}: {item.get('text', '')}"
-        for item in transcript if isinstance(item, dict)
-    ])
+    transcript_text = _format_transcript(transcript)
 
     analysis_prompt = f"""
     You are an AI Interview Coach for Campus Connect.
@@ -66,32 +68,303 @@ def analyze_interview_with_gemini(
     """
 
     try:
-        response = model.generate_content(
-            analysis_prompt,
-            generation_config={
-                "response_mime_type": "application/json"
-            }
-        )
-        data = json.loads(response.text)
-
-        def normalize_score(value):
-            try:
-                numeric = float(value)
-            except (TypeError, ValueError):
-                return value
-            if numeric > 10 and numeric <= 100:
-                numeric = numeric / 10
-            return max(0, min(10, numeric))
-
+        data = _generate_json(analysis_prompt)
         if isinstance(data, dict):
-            if "overall_score" in data:
-                data["overall_score"] = normalize_score(data.get("overall_score"))
-            metrics = data.get("metrics")
-            if isinstance(metrics, dict):
-                for key, val in metrics.items():
-                    metrics[key] = normalize_score(val)
+            _normalize_scores(data)
         return data
 
+    except ProviderBusy:
+        raise
     except Exception as e:
         print(f"Critical Gemini Error: {e}")
-        return {"error": "Could not generate analysis. Please contact support."}
\ No newline at end of file
+        return {"error": "Could not generate analysis. Please contact support."}
+
+
+def _generate_json(prompt: str):
+    model = get_gemini_model('models/gemini-2.5-flash')
+    response = model.generate_content(
+        prompt,
+        generation_config={
+            "response_mime_type": "application/json"
+        },
+        request_options=gemini_request_options(),
+    )
+    return json.loads(response.text)
+
+
+def _normalize_score(value):
+    try:
+        numeric = float(value)
+    except (TypeError, ValueError):
+        return value
+    if numeric > 10 and numeric <= 100:
+        numeric = numeric / 10
+    return max(0, min(10, numeric))
+
+
+def _normalize_scores(data: dict):
+    if "overall_score" in data:
+        data["overall_score"] = _normalize_score(data.get("overall_score"))
+    metrics = data.get("metrics")
+    if isinstance(metrics, dict):
+        for key, val in metrics.items():
+            metrics[key] = _normalize_score(val)
+
+
+def _format_transcript(transcript: list) -> str:
+    return "\n".join([
+        f"{item.get('speaker', 'Unknown')}: {item.get('text', '')}"
+        for item in transcript if isinstance(item, dict)
+    ])
+
+
+# Interviewer questions are matched against these in order; the first hit
+# decides the phase of the question and the answers that follow it.
+_PHASE_PATTERNS = (
+    ("company_motivation", re.compile(r"why do you want to join|what do you know about|why (this|our) company|questions for me")),
+    ("introduction", re.compile(r"introduc|about yourself|walk me through your background")),
+    ("behavioral", re.compile(r"a time when|conflict|disagree|challenge you faced|team ?mate|situation|handle (pressure|failure)")),
+    ("resume_projects", re.compile(r"project|resume|internship|experience at|you (built|worked on)")),
+    ("technical", re.compile(r"design|algorithm|complexity|implement|code|database|system|scale|data structure|api|optimi")),
+)
+
+
+def _question_phase(text: str, current: str) -> str:
+    lowered = text.lower()
+    for phase, pattern in _PHASE_PATTERNS:
+        if pattern.search(lowered):
+            return phase
+    return current
+
+
+def segment_transcript(transcript: list, max_chars: int = ANALYSIS_CHUNK_CHARS) -> list:
+    """
+    Split a transcript into scoring segments. Each interviewer line that
+    matches a phase pattern starts an exchange in that phase; exchanges are
+    grouped by phase (even when the interview switches back and forth) and
+    packed in order into segments of up to max_chars, so the number of
+    segments tracks transcript length, not the number of exchanges.
+    """
+    exchanges = []
+    phase = "introduction"
+    for item in transcript:
+        if not isinstance(item, dict):
+            continue
+        text = str(item.get("text", ""))
+        line = f"{item.get('speaker', 'Unknown')}: {text}"
+        is_question = str(item.get("speaker", "")).upper() == "AI"
+        if is_question:
+            phase = _question_phase(text, phase)
+        if is_question or not exchanges:
+            exchanges.append({"phase": phase, "lines": [], "chars": 0})
+        exchanges[-1]["lines"].append(line)
+        exchanges[-1]["chars"] += len(line) + 1
+
+    phase_order = {}
+    for exchange in exchanges:
+        phase_order.setdefault(exchange["phase"], len(phase_order))
+    # sorted() is stable, so exchanges keep their order within a phase.
+    exchanges.sort(key=lambda exchange: phase_order[exchange["phase"]])
+
+    segments = []
+    current = None
+    for exchange in exchanges:
+        if current is not None and current["chars"] + exchange["chars"] > max_chars:
+            segments.append(current)
+            current = None
+        if current is None:
+            current = {"phases": [], "lines": [], "chars": 0}
+        if exchange["phase"] not in current["phases"]:
+            current["phases"].append(exchange["phase"])
+        current["lines"].extend(exchange["lines"])
+        current["chars"] += exchange["chars"]
+    if current is not None:
+        segments.append(current)
+    for segment in segments:
+        segment["phase"] = ", ".join(segment["phases"])
+    return segments
+
+
+def _score_segment(segment: dict, company: str, role_name: str, topics: str) -> dict:
+    transcript_text = "\n".join(segment["lines"])
+    prompt = f"""
+    You are an AI Interview Coach for Campus Connect scoring ONE segment of a longer mock interview.
+
+    CONTEXT:
+    - Target Role: {role_name} at {company}
+    - Skills Focus: {topics}
+    - Interview phase of this segment: {segment["phase"]}
+
+    TRANSCRIPT SEGMENT:
+    {transcript_text}
+
+    Score only what this segment shows. Use null for metrics it gives no evidence for.
+    Use second-person language ("You ...") in text fields. Do not include markdown. Return valid JSON only.
+
+    OUTPUT JSON SHAPE:
+    {{
+        "metrics": {{
+            "technical": number (0-10) | null,
+            "behavioral": number (0-10) | null,
+            "communication": number (0-10) | null,
+            "problem_solving": number (0-10) | null,
+            "company_knowledge": number (0-10) | null
+        }},
+        "topics_covered": ["topic1"],
+        "key_strengths": ["You ..."],
+        "areas_for_improvement": ["Try to ..."],
+        "notes": "One or two sentences on how you did in this segment."
+    }}
+    """
+    data = _generate_json(prompt)
+    if not isinstance(data, dict):
+        raise ValueError("Segment analysis is not a JSON object")
+    _normalize_scores(data)
+    return data
+
+
+def _unique(items, limit: int) -> list:
+    seen = set()
+    result = []
+    for item in items:
+        text = str(item).strip()
+        if text and text.lower() not in seen:
+            seen.add(text.lower())
+            result.append(text)
+    return result[:limit]
+
+
+def _recommendation(score: float) -> str:
+    if score >= 8:
+        return "strong_yes"
+    if score >= 6.5:
+        return "yes"
+    if score >= 5:
+        return "maybe"
+    return "no"
+
+
+def _reduce_segments(scored: list) -> dict:
+    """
+    Chars-weighted merge of segment scores into the /analyze schema. A
+    metric no segment scored is None rather than 0, which would read as the
+    worst possible score.
+    """
+    metrics = {}
+    for name in METRICS:
+        weighted = [
+            (float(result["metrics"][name]), segment["chars"])
+            for segment, result in scored
+            if isinstance(result.get("metrics"), dict) and isinstance(result["metrics"].get(name), (int, float))
+        ]
+        total_weight = sum(weight for _, weight in weighted)
+        metrics[name] = round(sum(value * weight for value, weight in weighted) / total_weight, 1) if total_weight else None
+    assessed = [value for value in metrics.values() if value is not None]
+    overall_score = round(sum(assessed) / len(assessed), 1) if assessed else 0
+
+    def collect(key):
+        return [item for _, result in scored for item in (result.get(key) or []) if isinstance(result.get(key), list)]
+
+    notes = " ".join(str(result.get("notes") or "").strip() for _, result in scored).strip()
+    return {
+        "overall_score": overall_score,
+        "metrics": metrics,
+        "topics_covered": _unique(collect("topics_covered"), 12),
+        "overall_assessment": notes,
+        "key_strengths": _unique(collect("key_strengths"), 5),
+        "areas_for_improvement": _unique(collect("areas_for_improvement"), 5),
+        "recommendation": _recommendation(overall_score),
+        "reasoning": notes,
+    }
+
+
+def _write_summary(merged: dict, scored: list, company: str, role_name: str, interview_duration_sec: int) -> dict:
+    segment_notes = "\n".join(f"- {segment['phase']}: {result.get('notes', '')}" for segment, result in scored)
+    prompt = f"""
+    You are an AI Interview Coach for Campus Connect. A mock interview for {role_name} at {company}
+    ({interview_duration_sec} seconds) was scored segment by segment.
+
+    MERGED SCORES: {json.dumps(merged["metrics"])} (overall {merged["overall_score"]})
+    STRENGTHS: {json.dumps(merged["key_strengths"])}
+    IMPROVEMENTS: {json.dumps(merged["areas_for_improvement"])}
+    SEGMENT NOTES:
+    {segment_notes}
+
+    Write the final coaching summary in second person ("You ..."). Do not include markdown. Return valid JSON only:
+    {{
+        "overall_assessment": "You ...",
+        "recommendation": "strong_yes | yes | maybe | no",
+        "reasoning": "You ..."
+    }}
+    """
+    data = _generate_json(prompt)
+    return data if isinstance(data, dict) else {}
+
+
+async def analyze_interview(
+    transcript: list,
+    company: str = "Campus connect",
+    role_name: str = "Software Engineer",
+    topics: str = "General",
+    resume_summary: str = "No resume provided",
+    interview_duration_sec: int = 0
+) -> dict:
+    """
+    Async entry point for /analyze. Short transcripts take the single-prompt
+    path; longer ones are split into phase segments that are scored in
+    parallel (at most INTERVIEW_ANALYSIS_PARALLELISM per request), merged
+    locally and given a short written summary. Failed segments are skipped
+    and reported under "coverage".
+    """
+    segments = segment_transcript(transcript)
+    if len(segments) <= 1 or sum(segment["chars"] for segment in segments) <= ANALYSIS_CHUNK_CHARS:
+        return await run_provider_call(
+            "gemini",
+            analyze_interview_with_gemini,
+            transcript=transcript,
+            company=company,
+            role_name=role_name,
+            topics=topics,
+            resume_summary=resume_summary,
+            interview_duration_sec=interview_duration_sec,
+        )
+
+    limit = asyncio.Semaphore(ANALYSIS_PARALLELISM)
+
+    async def score(segment):
+        async with limit:
+            with span("analysis.segment", phase=segment["phase"], chars=segment["chars"]):
+                return await run_provider_call("gemini", _score_segment, segment, company, role_name, topics)
+
+    results = await asyncio.gather(*(score(segment) for segment in segments), return_exceptions=True)
+    scored = []
+    for segment, result in zip(segments, results):
+        if isinstance(result, Exception):
+            print(f"Gemini segment analysis failed ({segment['phase']}): {result}")
+        else:
+            scored.append((segment, result))
+    if not scored:
+        busy = next((result for result in results if isinstance(result, ProviderBusy)), None)
+        if busy is not None:
+            raise busy
+        return {"error": "Could not generate analysis. Please contact support."}
+
+    merged = _reduce_segments(scored)
+    try:
+        summary = await run_provider_call(
+            "gemini", _write_summary, merged, scored, company, role_name, interview_duration_sec
+        )
+        for key in ("overall_assessment", "reasoning"):
+            if str(summary.get(key) or "").strip():
+                merged[key] = str(summary[key]).strip()
+        if summary.get("recommendation") in {"strong_yes", "yes", "maybe", "no"}:
+            merged["recommendation"] = summary["recommendation"]
+    except Exception as e:
+        print(f"Gemini analysis summary failed, using merged notes: {e}")
+
+    merged["coverage"] = {
+        "segments": len(segments),
+        "failed_segments": len(segments) - len(scored),
+        "phases": _unique((phase for segment, _ in scored for phase in segment["phases"]), len(_PHASE_PATTERNS)),
+    }
+    return merged
@@ -0,0 +1,176 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from cache_store import build_cache
+from provider_clients import get_groq_client
+from rate_limiter import request_priority
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+INTERVIEW_MEMORY_RECENT_MESSAGES = _env_int("INTERVIEW_MEMORY_RECENT_MESSAGES", 6)
+INTERVIEW_MEMORY_STRIDE = _env_int("INTERVIEW_MEMORY_STRIDE", 4)
+INTERVIEW_MEMORY_TOKEN_BUDGET = _env_int("INTERVIEW_MEMORY_TOKEN_BUDGET", 1500)
+INTERVIEW_SUMMARY_MAX_TOKENS = _env_int("INTERVIEW_SUMMARY_MAX_TOKENS", 300)
+INTERVIEW_SUMMARY_WORKERS = _env_int("INTERVIEW_SUMMARY_WORKERS", 2)
+INTERVIEW_SUMMARY_MODEL = os.getenv("INTERVIEW_SUMMARY_MODEL", "llama-3.1-8b-instant")
+
+# Summaries are keyed by a hash chain over the transcript, stored only at
+# every INTERVIEW_MEMORY_STRIDE-th message so a lookup touches a couple of
+# checkpoints instead of every prefix.
+_summary_cache = build_cache(
+    "interview_memory",
+    env_prefix="INTERVIEW_MEMORY",
+    default_ttl_sec=6 * 3600,
+    default_max_entries=4096,
+)
+_summary_executor = ThreadPoolExecutor(max_workers=INTERVIEW_SUMMARY_WORKERS, thread_name_prefix="interview-memory")
+
+_lock = threading.Lock()
+_in_flight: set = set()
+_counters = {
+    "requests": 0,
+    "summary_used": 0,
+    "summaries_scheduled": 0,
+    "summaries_written": 0,
+    "summaries_failed": 0,
+    "messages_dropped": 0,
+    "history_tokens_last": 0,
+    "history_tokens_max": 0,
+}
+
+_SUMMARY_PROMPT = (
+    "You maintain the running memory of a job interview. Merge the existing summary with the new "
+    "transcript lines into one compact summary of at most 150 words. Keep the questions already asked, "
+    "the candidate's key answers, claimed skills and projects, strengths, weak spots and which stages "
+    "(introduction, resume, behavioral, technical, company motivation) are covered. Output plain text only."
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough chars/4 estimate plus per-message overhead; close enough for budgeting.
+    return len(text or "") // 4 + 4
+
+
+def _chain_hashes(history: List[Dict[str, str]]) -> List[str]:
+    """hashes[i] identifies the transcript prefix history[:i]."""
+    hashes = [""]
+    digest = hashlib.sha256()
+    for message in history:
+        digest.update(f"{message['role']}\x00{message['content']}\x1e".encode("utf-8"))
+        hashes.append(digest.copy().hexdigest())
+    return hashes
+
+
+def _latest_summary(hashes: List[str], boundary: int) -> Tuple[int, Optional[str]]:
+    checkpoint = boundary - boundary % INTERVIEW_MEMORY_STRIDE
+    while checkpoint > 0:
+        summary = _summary_cache.get(hashes[checkpoint])
+        if summary:
+            return checkpoint, summary
+        checkpoint -= INTERVIEW_MEMORY_STRIDE
+    return 0, None
+
+
+def _format_transcript(messages: List[Dict[str, str]]) -> str:
+    speakers = {"user": "Candidate", "assistant": "Interviewer"}
+    return "\n".join(f"{speakers.get(m['role'], 'Interviewer')}: {m['content']}" for m in messages)
+
+
+def _summarize(previous: Optional[str], messages: List[Dict[str, str]]) -> str:
+    completion = get_groq_client().chat.completions.create(
+        model=INTERVIEW_SUMMARY_MODEL,
+        messages=[
+            {"role": "system", "content": _SUMMARY_PROMPT},
+            {
+                "role": "user",
+                "content": f"Existing summary:\n{previous or 'None yet.'}\n\nNew transcript:\n{_format_transcript(messages)}",
+            },
+        ],
+        temperature=0.2,
+        max_tokens=INTERVIEW_SUMMARY_MAX_TOKENS,
+    )
+    return (completion.choices[0].message.content or "").strip()
+
+
+def _update_summary(target_key: str, previous: Optional[str], messages: List[Dict[str, str]]):
+    try:
+        with request_priority("batch"):
+            summary = _summarize(previous, messages)
+        if summary:
+            _summary_cache.set(target_key, summary)
+            _counters["summaries_written"] += 1
+    except Exception as e:
+        _counters["summaries_failed"] += 1
+        logger.warning("Interview summary update failed: %s", e)
+    finally:
+        with _lock:
+            _in_flight.discard(target_key)
+
+
+def _schedule_summary(target_key: str, previous: Optional[str], messages: List[Dict[str, str]]):
+    with _lock:
+        if target_key in _in_flight:
+            return
+        _in_flight.add(target_key)
+        _counters["summaries_scheduled"] += 1
+    _summary_executor.submit(_update_summary, target_key, previous, messages)
+
+
+def build_interview_memory(history: List[Dict[str, str]]) -> Tuple[Optional[str], List[Dict[str, str]]]:
+    """
+    Compact view of a normalized transcript: the latest rolling summary plus
+    as many recent messages as fit INTERVIEW_MEMORY_TOKEN_BUDGET. Messages
+    older than the recent window are folded into the summary in the
+    background, so the request never waits on a summarization call.
+    """
+    _counters["requests"] += 1
+    window_start = max(0, len(history) - INTERVIEW_MEMORY_RECENT_MESSAGES)
+    hashes = _chain_hashes(history)
+    covered, summary = _latest_summary(hashes, window_start)
+
+    target = window_start - window_start % INTERVIEW_MEMORY_STRIDE
+    if target > covered:
+        _schedule_summary(hashes[target], summary, history[covered:target])
+
+    budget = INTERVIEW_MEMORY_TOKEN_BUDGET
+    if summary:
+        _counters["summary_used"] += 1
+        budget -= estimate_tokens(summary)
+
+    # Newest first: the recent window, then any turns the summary has not
+    # absorbed yet, until the budget runs out.
+    kept: List[Dict[str, str]] = []
+    for message in reversed(history[covered:]):
+        cost = estimate_tokens(message["content"])
+        if kept and cost > budget:
+            break
+        kept.append(message)
+        budget -= cost
+    kept.reverse()
+
+    used = INTERVIEW_MEMORY_TOKEN_BUDGET - budget
+    _counters["messages_dropped"] += len(history) - covered - len(kept)
+    _counters["history_tokens_last"] = used
+    _counters["history_tokens_max"] = max(_counters["history_tokens_max"], used)
+    return summary, kept
+
+
+def interview_memory_stats() -> Dict[str, Any]:
+    return {
+        **_counters,
+        "in_flight": len(_in_flight),
+        "recent_messages": INTERVIEW_MEMORY_RECENT_MESSAGES,
+        "token_budget": INTERVIEW_MEMORY_TOKEN_BUDGET,
+    }
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import uuid
+import weakref
+from typing import Any, Dict, List, Optional
+
+from cache_store import build_cache
+
+# Sessions hold everything /interviewer used to receive on every turn. Each
+# save refreshes the TTL, so an active interview never expires mid-call.
+# INTERVIEW_SESSION_CACHE_BACKEND=sqlite keeps them across restarts.
+_session_store = build_cache(
+    "interview_sessions",
+    env_prefix="INTERVIEW_SESSION",
+    default_ttl_sec=2 * 3600,
+    default_max_entries=2048,
+)
+_turn_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+SESSION_START_MESSAGE = "START_SESSION"
+_SPEAKERS = {"assistant": "AI", "user": "You"}
+
+
+def create_session(
+    *,
+    company: str,
+    role_name: str,
+    topics: str,
+    resume_summary: str,
+    difficulty: str,
+    interview_prompt: str = "",
+) -> Dict[str, Any]:
+    now = time.time()
+    session = {
+        "session_id": uuid.uuid4().hex,
+        "company": company,
+        "role_name": role_name,
+        "topics": topics,
+        "resume_summary": resume_summary,
+        "difficulty": difficulty,
+        "interview_prompt": interview_prompt,
+        "history": [],
+        "end_call_prompt_count": 0,
+        "interview_ended": False,
+        "created_at": now,
+        "updated_at": now,
+    }
+    save_session(session)
+    return session
+
+
+def get_session(session_id: str) -> Optional[Dict[str, Any]]:
+    return _session_store.get(session_id.strip().lower())
+
+
+def save_session(session: Dict[str, Any]):
+    session["updated_at"] = time.time()
+    _session_store.set(session["session_id"], session)
+
+
+def delete_session(session_id: str) -> bool:
+    return _session_store.delete(session_id.strip().lower())
+
+
+def session_turn_lock(session_id: str) -> asyncio.Lock:
+    """Serializes turns of one session so concurrent requests cannot drop history."""
+    session_id = session_id.strip().lower()
+    lock = _turn_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _turn_locks[session_id] = lock
+    return lock
+
+
+def session_chat_kwargs(session: Dict[str, Any], message: str, interview_duration_sec: int) -> Dict[str, Any]:
+    return {
+        "user_input": message,
+        "chat_history": session["history"],
+        "company": session["company"],
+        "role_name": session["role_name"],
+        "topics": session["topics"],
+        "resume_summary": session["resume_summary"],
+        "interview_duration_sec": interview_duration_sec,
+        "difficulty": session["difficulty"],
+        "end_call_prompt_count": session["end_call_prompt_count"],
+        "interview_prompt": session["interview_prompt"],
+    }
+
+
+def record_turn(session: Dict[str, Any], message: str, result: Dict[str, Any]):
+    if message != SESSION_START_MESSAGE:
+        session["history"].append({"role": "user", "content": message})
+    session["history"].append({"role": "assistant", "content": result.get("reply", "")})
+    session["end_call_prompt_count"] = result.get("end_call_prompt_count", session["end_call_prompt_count"])
+    session["interview_ended"] = bool(result.get("interview_ended", False))
+    save_session(session)
+
+
+def session_transcript(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """History in the {speaker, text, id} shape /analyze accepts."""
+    return [
+        {"speaker": _SPEAKERS.get(message["role"], "AI"), "text": message["content"], "id": index}
+        for index, message in enumerate(session["history"])
+    ]
+
+
+def session_summary(session: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "session_id": session["session_id"],
+        "company": session["company"],
+        "role_name": session["role_name"],
+        "topics": session["topics"],
+        "difficulty": session["difficulty"],
+        "turns": sum(1 for message in session["history"] if message["role"] == "user"),
+        "end_call_prompt_count": session["end_call_prompt_count"],
+        "interview_ended": session["interview_ended"],
+        "created_at": session["created_at"],
+        "updated_at": session["updated_at"],
+        "expires_in_sec": _session_store.ttl_sec,
+    }
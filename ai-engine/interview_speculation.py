@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+SPECULATION_STABLE_MS = _env_float("INTERVIEW_SPECULATION_STABLE_MS", 600)
+SPECULATIVE_DRAFTS = os.getenv("INTERVIEW_SPECULATIVE_DRAFTS", "true").strip().lower() in {"1", "true", "yes"}
+
+_counters = {
+    "partials": 0,
+    "drafts_started": 0,
+    "drafts_used": 0,
+    "drafts_discarded": 0,
+    "drafts_failed": 0,
+    "speculative_turns": 0,
+    "regular_turns": 0,
+    "speculative_turn_ms_total": 0.0,
+    "regular_turn_ms_total": 0.0,
+}
+
+
+def normalize_utterance(text: str) -> str:
+    return " ".join("".join(ch for ch in (text or "").lower() if ch.isalnum() or ch.isspace()).split())
+
+
+class _Speculation:
+    def __init__(self, utterance: str, history_length: int):
+        self.utterance = utterance
+        self.history_length = history_length
+        self.task: Optional[asyncio.Task] = None
+        self.drafting = False
+
+    def cancel(self):
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+
+# One pending speculation per session; state is per process and is simply
+# lost when a session lands on another worker.
+_speculations: Dict[str, _Speculation] = {}
+
+
+async def _draft_when_stable(speculation: _Speculation, prepare: Callable[[], Awaitable[Any]], draft):
+    await asyncio.sleep(SPECULATION_STABLE_MS / 1000)
+    try:
+        await prepare()
+    except Exception as e:
+        logger.warning("Speculative interview warmup failed: %s", e)
+    if draft is None:
+        return None
+    speculation.drafting = True
+    _counters["drafts_started"] += 1
+    try:
+        return await draft()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _counters["drafts_failed"] += 1
+        logger.warning("Speculative interview draft failed: %s", e)
+        return None
+
+
+def submit_partial(
+    session_id: str,
+    partial_text: str,
+    history_length: int,
+    prepare: Callable[[], Awaitable[Any]],
+    draft: Optional[Callable[[], Awaitable[Dict[str, Any]]]],
+) -> Dict[str, Any]:
+    """
+    Record the candidate's latest partial transcript. Once it stays the same
+    for INTERVIEW_SPECULATION_STABLE_MS, prepare() warms the turn and
+    draft() produces a candidate reply. A newer, different partial
+    cancels the pending work.
+    """
+    _counters["partials"] += 1
+    utterance = normalize_utterance(partial_text)
+    current = _speculations.get(session_id)
+    if current is not None and current.utterance == utterance and current.history_length == history_length:
+        return {"state": "ready" if current.task.done() else "pending"}
+
+    if current is not None:
+        current.cancel()
+        _counters["drafts_discarded"] += 1
+
+    speculation = _Speculation(utterance, history_length)
+    speculation.task = asyncio.create_task(
+        _draft_when_stable(speculation, prepare, draft if SPECULATIVE_DRAFTS else None)
+    )
+    _speculations[session_id] = speculation
+    return {"state": "pending"}
+
+
+async def take_draft(session_id: str, message: str, history_length: int) -> Optional[Dict[str, Any]]:
+    """
+    Result of a speculative draft made for exactly this message and history,
+    waiting for it if it is already running. Any other speculation for the
+    session is cancelled.
+    """
+    speculation = _speculations.pop(session_id, None)
+    if speculation is None:
+        return None
+    matches = speculation.utterance == normalize_utterance(message) and speculation.history_length == history_length
+    # A draft that has not started yet would only add the debounce delay.
+    if not matches or not speculation.drafting:
+        speculation.cancel()
+        _counters["drafts_discarded"] += 1
+        return None
+    try:
+        result = await speculation.task
+    except asyncio.CancelledError:
+        return None
+    if result is None:
+        return None
+    _counters["drafts_used"] += 1
+    return result
+
+
+def discard(session_id: str):
+    speculation = _speculations.pop(session_id, None)
+    if speculation is not None:
+        speculation.cancel()
+
+
+def record_turn_latency(started_at: float, speculative: bool):
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    kind = "speculative" if speculative else "regular"
+    _counters[f"{kind}_turns"] += 1
+    _counters[f"{kind}_turn_ms_total"] += elapsed_ms
+
+
+def speculation_stats() -> Dict[str, Any]:
+    stats = dict(_counters)
+    speculative_turns = stats["speculative_turns"]
+    regular_turns = stats["regular_turns"]
+    stats["avg_speculative_turn_ms"] = (
+        round(stats["speculative_turn_ms_total"] / speculative_turns, 2) if speculative_turns else None
+    )
+    stats["avg_regular_turn_ms"] = round(stats["regular_turn_ms_total"] / regular_turns, 2) if regular_turns else None
+    stats["pending"] = len(_speculations)
+    stats["drafts_enabled"] = SPECULATIVE_DRAFTS
+    return stats
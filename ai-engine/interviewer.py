@@ -1,15 +1,18 @@
 import json
-import os
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, Iterator, List
 
-from dotenv import load_dotenv
-from groq import Groq
+from interview_memory import build_interview_memory
+from language_guard import ENGLISH_ONLY_INSTRUCTION, enforce_english
+from provider_clients import CHAT_MODEL, get_groq_client
+from tracing import span, traced
 
-load_dotenv()
-
-api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=api_key)
-CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
+# English stand-ins used when a non-English reply cannot be rewritten in
+# time, chosen so the turn keeps its purpose and matches the flags sent
+# back to the client.
+OPENING_FALLBACK_REPLY = "Hello, and thanks for joining today. Could you start with a brief introduction about yourself?"
+END_CALL_FALLBACK_REPLY = "Do you have any questions for me? If not, you may leave by clicking the End Call button."
+CLOSING_REPLY = "Thank you for your time today. The interview is now complete. Please click End Call."
 
 
 def _normalize_history(chat_history: List[Dict[str, Any]] | None) -> List[Dict[str, str]]:
@@ -31,6 +34,11 @@ def _normalize_history(chat_history: List[Dict[str, Any]] | None) -> List[Dict[s
     return normalized
 
 
+def _is_opening_turn(user_input: str, chat_history: List[Dict[str, Any]] | None) -> bool:
+    history = _normalize_history(chat_history)
+    return user_input == "START_SESSION" or not any(item["role"] == "user" for item in history)
+
+
 def _build_system_prompt(company: str, role_name: str, topics: str, difficulty: str, turn_index: int, end_call_prompt_count: int) -> str:
     return f"""
 You are an expert technical interviewer for {company} interviewing a candidate for {role_name}.
@@ -66,19 +74,20 @@ Return STRICT JSON only with this shape:
 """
 
 
-def run_interview_chat(
+@traced("interview.prompt_assembly")
+def _build_interview_messages(
     *,
     user_input: str,
-    chat_history: List[Dict[str, Any]] | None = None,
-    company: str = "Tech Company",
-    role_name: str = "Software Engineer",
-    topics: str = "General",
-    resume_summary: str = "No resume provided",
-    interview_duration_sec: int = 0,
-    difficulty: str = "moderate",
-    end_call_prompt_count: int = 0,
-    interview_prompt: str | None = None,
-) -> Dict[str, Any]:
+    chat_history: List[Dict[str, Any]] | None,
+    company: str,
+    role_name: str,
+    topics: str,
+    resume_summary: str,
+    interview_duration_sec: int,
+    difficulty: str,
+    end_call_prompt_count: int,
+    interview_prompt: str | None,
+) -> List[Dict[str, str]]:
     normalized_history = _normalize_history(chat_history)
     user_turns = sum(1 for item in normalized_history if item.get("role") == "user")
     turn_index = user_turns + (0 if user_input == "START_SESSION" else 1)
@@ -94,24 +103,28 @@ def run_interview_chat(
         "content": system_prompt,
     }
 
-    messages: List[Dict[str, str]] = [system_message, *normalized_history]
+    summary, recent_history = build_interview_memory(normalized_history)
+    messages: List[Dict[str, str]] = [system_message]
+    if summary:
+        messages.append({"role": "system", "content": f"Summary of the interview so far: {summary}"})
+    messages.extend(recent_history)
     messages.append({
         "role": "system",
         "content": f"Candidate resume summary: {resume_summary}. Interview elapsed seconds: {interview_duration_sec}.",
     })
+    messages.append({"role": "system", "content": ENGLISH_ONLY_INSTRUCTION})
     messages.append({"role": "user", "content": user_input})
+    return messages
 
-    completion = client.chat.completions.create(
-        model=CHAT_MODEL,
-        messages=messages,
-        temperature=0.5,
-        max_tokens=240,
-        response_format={"type": "json_object"},
-    )
 
-    content = completion.choices[0].message.content or "{}"
-    payload = json.loads(content)
+def prepare_interview_turn(chat_history: List[Dict[str, Any]] | None):
+    """Warm what the next turn needs: the Groq client and the history summary."""
+    get_groq_client()
+    build_interview_memory(_normalize_history(chat_history))
+
 
+@traced("interview.post_process")
+def _finalize_interview_reply(payload: Dict[str, Any], end_call_prompt_count: int, opening: bool = False) -> Dict[str, Any]:
     reply = str(payload.get("reply") or "Could you explain your approach in more detail?").strip()
     allotted_time_sec = payload.get("allotted_time_sec", 45)
     try:
@@ -126,28 +139,17 @@ def run_interview_chat(
     # Only end if AI explicitly sets it (frontend will handle 3-silence auto-disconnect)
     interview_ended = bool(payload.get("interview_ended", False))
 
-    lower_reply = reply.lower()
-    hinglish_markers = [" kya ", " kaise ", " aap ", " bata", "sahayta", "yahaan", "haan", "nahi"]
-    if any(marker in f" {lower_reply} " for marker in hinglish_markers):
-        rewrite_completion = client.chat.completions.create(
-            model=CHAT_MODEL,
-            messages=[
-                {"role": "system", "content": "Rewrite the following into natural professional English. Keep meaning same. Output JSON with key 'reply'."},
-                {"role": "user", "content": reply},
-            ],
-            temperature=0.2,
-            max_tokens=180,
-            response_format={"type": "json_object"},
-        )
-        rewrite_content = rewrite_completion.choices[0].message.content or "{}"
-        rewrite_payload = json.loads(rewrite_content)
-        rewritten = str(rewrite_payload.get("reply") or "").strip()
-        if rewritten:
-            reply = rewritten
-
     if new_prompt_count >= 3:
-        reply = "Thank you for your time today. The interview is now complete. Please click End Call."
+        reply = CLOSING_REPLY
         interview_ended = True
+    elif interview_ended:
+        reply = enforce_english(reply, fallback=CLOSING_REPLY)
+    elif end_call_prompted:
+        reply = enforce_english(reply, fallback=END_CALL_FALLBACK_REPLY)
+    elif opening:
+        reply = enforce_english(reply, fallback=OPENING_FALLBACK_REPLY)
+    else:
+        reply = enforce_english(reply)
 
     return {
         "reply": reply,
@@ -156,3 +158,180 @@ def run_interview_chat(
         "end_call_prompted": end_call_prompted,
         "end_call_prompt_count": new_prompt_count,
     }
+
+
+def run_interview_chat(
+    *,
+    user_input: str,
+    chat_history: List[Dict[str, Any]] | None = None,
+    company: str = "Tech Company",
+    role_name: str = "Software Engineer",
+    topics: str = "General",
+    resume_summary: str = "No resume provided",
+    interview_duration_sec: int = 0,
+    difficulty: str = "moderate",
+    end_call_prompt_count: int = 0,
+    interview_prompt: str | None = None,
+) -> Dict[str, Any]:
+    messages = _build_interview_messages(
+        user_input=user_input,
+        chat_history=chat_history,
+        company=company,
+        role_name=role_name,
+        topics=topics,
+        resume_summary=resume_summary,
+        interview_duration_sec=interview_duration_sec,
+        difficulty=difficulty,
+        end_call_prompt_count=end_call_prompt_count,
+        interview_prompt=interview_prompt,
+    )
+
+    completion = get_groq_client().chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=0.5,
+        max_tokens=240,
+        response_format={"type": "json_object"},
+    )
+
+    content = completion.choices[0].message.content or "{}"
+    with span("interview.parse"):
+        payload = json.loads(content)
+    return _finalize_interview_reply(payload, end_call_prompt_count, opening=_is_opening_turn(user_input, chat_history))
+
+
+class _ReplyFieldStream:
+    """
+    Incrementally decodes the "reply" string value out of a JSON object
+    that is still being streamed, so reply text can be forwarded before
+    the closing brace arrives.
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.started = False
+        self.finished = False
+        self.text = ""
+
+    def feed(self, chunk: str) -> str:
+        self.buffer += chunk
+        if self.finished:
+            return ""
+
+        if not self.started:
+            match = re.search(r'"reply"\s*:\s*"', self.buffer)
+            if not match:
+                return ""
+            self.started = True
+            self.position = match.end()
+
+        decoded = []
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+            if char == '"':
+                self.finished = True
+                self.position += 1
+                break
+            if char != "\\":
+                decoded.append(char)
+                self.position += 1
+                continue
+
+            if self.position + 1 >= len(self.buffer):
+                break
+            escape = self.buffer[self.position + 1]
+            if escape == "u":
+                if self.position + 6 > len(self.buffer):
+                    break
+                try:
+                    decoded.append(chr(int(self.buffer[self.position + 2:self.position + 6], 16)))
+                except ValueError:
+                    pass
+                self.position += 6
+                continue
+            decoded.append(self._ESCAPES.get(escape, escape))
+            self.position += 2
+
+        delta = "".join(decoded)
+        self.text += delta
+        return delta
+
+
+def stream_interview_chat(
+    *,
+    user_input: str,
+    chat_history: List[Dict[str, Any]] | None = None,
+    company: str = "Tech Company",
+    role_name: str = "Software Engineer",
+    topics: str = "General",
+    resume_summary: str = "No resume provided",
+    interview_duration_sec: int = 0,
+    difficulty: str = "moderate",
+    end_call_prompt_count: int = 0,
+    interview_prompt: str | None = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Streaming twin of run_interview_chat. Yields {"type": "delta", "text": ...}
+    events while the reply is generated, then one {"type": "final", ...}
+    event carrying the same fields run_interview_chat returns. The final
+    reply can differ from the streamed text when it was rewritten to
+    English or the interview was force-ended.
+    """
+    messages = _build_interview_messages(
+        user_input=user_input,
+        chat_history=chat_history,
+        company=company,
+        role_name=role_name,
+        topics=topics,
+        resume_summary=resume_summary,
+        interview_duration_sec=interview_duration_sec,
+        difficulty=difficulty,
+        end_call_prompt_count=end_call_prompt_count,
+        interview_prompt=interview_prompt,
+    )
+    messages.append({"role": "system", "content": "Respond with the JSON object only, starting with the \"reply\" key."})
+
+    # Groq JSON mode cannot be combined with streaming, so the JSON contract
+    # is enforced by the prompt and validated once the stream completes.
+    stream = get_groq_client().chat.completions.create(
+        model=CHAT_MODEL,
+        messages=messages,
+        temperature=0.5,
+        max_tokens=240,
+        stream=True,
+    )
+
+    reply_stream = _ReplyFieldStream()
+    with span("interview.stream") as stream_span:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            text = reply_stream.feed(delta)
+            if text:
+                yield {"type": "delta", "text": text}
+        stream_span.set(reply_chars=len(reply_stream.text))
+
+    payload = _parse_streamed_payload(reply_stream.buffer)
+    if not payload.get("reply") and reply_stream.text:
+        payload["reply"] = reply_stream.text
+
+    result = _finalize_interview_reply(payload, end_call_prompt_count, opening=_is_opening_turn(user_input, chat_history))
+    result["reply_replaced"] = result["reply"] != reply_stream.text.strip()
+    yield {"type": "final", **result}
+
+
+@traced("interview.parse")
+def _parse_streamed_payload(content: str) -> Dict[str, Any]:
+    try:
+        payload = json.loads(content)
+    except (TypeError, ValueError):
+        match = re.search(r"\{[\s\S]*\}", content or "")
+        try:
+            payload = json.loads(match.group(0)) if match else {}
+        except ValueError:
+            payload = {}
+    return payload if isinstance(payload, dict) else {}
@@ -0,0 +1,355 @@
+import asyncio
+import ipaddress
+import itertools
+import logging
+import os
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from fastapi import HTTPException
+
+from cache_store import build_cache, make_cache_key
+from provider_clients import get_async_http_client
+import tracing
+from rate_limiter import ProviderBusy, request_priority
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+JOB_WORKERS = _env_int("JOB_WORKERS", 4)
+JOB_QUEUE_MAX = _env_int("JOB_QUEUE_MAX", 1000)
+JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+JOB_RETRY_BACKOFF_SEC = _env_float("JOB_RETRY_BACKOFF_SEC", 2.0)
+JOB_CALLBACK_ATTEMPTS = _env_int("JOB_CALLBACK_ATTEMPTS", 3)
+# Hosts callback_url may point at. When empty, any host is accepted as long
+# as every address it resolves to is public, so callbacks cannot reach
+# loopback, private networks or cloud metadata endpoints.
+JOB_CALLBACK_ALLOWED_HOSTS = frozenset(
+    host.strip().lower() for host in os.getenv("JOB_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+)
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+
+# Job records (status, result, error) live in a cache_store cache so they
+# can be polled until JOB_STORE_CACHE_TTL_SEC runs out. With the SQLite
+# backend finished results survive a restart; queued work does not, since
+# the queue itself is in-process.
+_job_store = build_cache(
+    "jobs",
+    env_prefix="JOB_STORE",
+    default_ttl_sec=24 * 3600,
+    default_max_entries=10000,
+)
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+_handlers: Dict[str, JobHandler] = {}
+_queue: Optional[asyncio.PriorityQueue] = None
+_workers: List[asyncio.Task] = []
+_sequence = itertools.count()
+_payloads: Dict[str, Dict[str, Any]] = {}
+_in_flight: Dict[str, str] = {}
+_background: set = set()
+_counters = {"submitted": 0, "deduplicated": 0, "succeeded": 0, "failed": 0, "retried": 0, "callbacks_failed": 0}
+
+
+def register_job_type(kind: str, handler: JobHandler):
+    _handlers[kind] = handler
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return _job_store.get(job_id.strip().lower())
+
+
+def _save(job: Dict[str, Any]):
+    _job_store.set(job["job_id"], job)
+
+
+def public_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in job.items() if key != "dedup_key"}
+
+
+def submit_job(
+    kind: str, payload: Dict[str, Any], priority: str = "normal", callback_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Queue a job and return its record straight away. An identical job
+    (same kind, payload and callback_url) that is still queued or running
+    is returned instead of queueing a second copy.
+    """
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job type: {kind}")
+    if _queue is None:
+        raise HTTPException(status_code=503, detail="Job workers are not running.")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of: {', '.join(PRIORITIES)}")
+    if callback_url:
+        _check_callback_url(callback_url)
+
+    # The callback is part of the key: a caller that asked to be notified
+    # must not be handed a job that will report to someone else.
+    dedup_key = make_cache_key(kind, payload, callback_url or "")
+    existing_id = _in_flight.get(dedup_key)
+    if existing_id is not None:
+        existing = get_job(existing_id)
+        if existing is not None and existing["status"] in {"queued", "running"}:
+            _counters["deduplicated"] += 1
+            return {**public_job(existing), "deduplicated": True}
+
+    if _queue.full():
+        raise HTTPException(status_code=503, detail="Job queue is full. Try again later.")
+
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": "queued",
+        "priority": priority,
+        "attempts": 0,
+        "callback_url": callback_url,
+        "callback_status": None,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None,
+        "dedup_key": dedup_key,
+        "request_id": tracing.current_request_id(),
+    }
+    _save(job)
+    _payloads[job["job_id"]] = payload
+    _in_flight[dedup_key] = job["job_id"]
+    _queue.put_nowait((PRIORITIES[priority], next(_sequence), job["job_id"]))
+    _counters["submitted"] += 1
+    return {**public_job(job), "deduplicated": False}
+
+
+def _callback_host(callback_url: str) -> str:
+    parts = urlsplit(callback_url)
+    if parts.scheme not in {"http", "https"} or not parts.hostname:
+        raise HTTPException(status_code=400, detail="callback_url must be an http(s) URL.")
+    return parts.hostname.lower()
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global
+
+
+def _check_callback_url(callback_url: str):
+    """Reject callback URLs outside the allowlist or at a literal non-public IP."""
+    host = _callback_host(callback_url)
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        if host not in JOB_CALLBACK_ALLOWED_HOSTS:
+            raise HTTPException(status_code=400, detail="callback_url host is not allowed.")
+        return
+    if host == "localhost" or host.endswith(".localhost"):
+        raise HTTPException(status_code=400, detail="callback_url must not point at a private address.")
+    try:
+        public = _is_public(host)
+    except ValueError:
+        return  # a hostname; its addresses are checked before each delivery
+    if not public:
+        raise HTTPException(status_code=400, detail="callback_url must not point at a private address.")
+
+
+async def _callback_allowed(callback_url: str) -> bool:
+    """
+    Re-check the callback target right before POSTing, resolving the host so
+    a public-looking name cannot lead to a private address.
+    """
+    try:
+        _check_callback_url(callback_url)
+    except HTTPException:
+        return False
+    host = _callback_host(callback_url)
+    if JOB_CALLBACK_ALLOWED_HOSTS:
+        return True
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, None)
+    except OSError:
+        return False
+    return bool(infos) and all(_is_public(info[4][0]) for info in infos)
+
+
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a job that has not started yet; 404 if it is unknown, 409 if it already started."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    if job["status"] != "queued":
+        raise HTTPException(status_code=409, detail="Only queued jobs can be cancelled.")
+    job.update(status="cancelled", finished_at=time.time())
+    _save(job)
+    _payloads.pop(job["job_id"], None)
+    _in_flight.pop(job["dedup_key"], None)
+    return job
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, HTTPException):
+        # 429 means a provider rate budget shed the job; it is deferred, not failed.
+        return error.status_code >= 500 or error.status_code == 429
+    return not isinstance(error, (ValueError, TypeError))
+
+
+async def _requeue_later(job: Dict[str, Any], delay: float):
+    await asyncio.sleep(delay)
+    if _queue is not None:
+        await _queue.put((PRIORITIES[job["priority"]], next(_sequence), job["job_id"]))
+
+
+def _spawn(coroutine):
+    task = asyncio.create_task(coroutine)
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+async def _send_callback(job: Dict[str, Any]):
+    body = public_job(job)
+    body.pop("callback_status", None)
+    if not await _callback_allowed(job["callback_url"]):
+        logger.warning("Job %s callback to a disallowed host was not sent", job["job_id"])
+        job["callback_status"] = "rejected"
+        _save(job)
+        _counters["callbacks_failed"] += 1
+        return
+    for attempt in range(JOB_CALLBACK_ATTEMPTS):
+        try:
+            # No redirects: a 3xx must not bounce the result to another host.
+            response = await get_async_http_client().post(job["callback_url"], json=body, follow_redirects=False)
+            response.raise_for_status()
+            job["callback_status"] = "delivered"
+            _save(job)
+            return
+        except Exception as e:
+            logger.warning("Job %s callback attempt %d failed: %s", job["job_id"], attempt + 1, e)
+            await asyncio.sleep(JOB_RETRY_BACKOFF_SEC * (2 ** attempt))
+    job["callback_status"] = "failed"
+    _save(job)
+    _counters["callbacks_failed"] += 1
+
+
+def _finish(job: Dict[str, Any], status: str, result: Any = None, error: Optional[str] = None):
+    job.update(status=status, result=result, error=error, finished_at=time.time())
+    if job["callback_url"]:
+        job["callback_status"] = "pending"
+    _save(job)
+    _payloads.pop(job["job_id"], None)
+    _in_flight.pop(job["dedup_key"], None)
+    _counters[status] += 1
+    if job["callback_url"]:
+        # Delivered off the worker so a slow receiver cannot stall the queue.
+        _spawn(_send_callback(job))
+
+
+async def _run(job_id: str):
+    job = get_job(job_id)
+    payload = _payloads.get(job_id)
+    if job is None or payload is None or job["status"] == "cancelled":
+        return
+
+    job.update(status="running", attempts=job["attempts"] + 1, started_at=job["started_at"] or time.time())
+    _save(job)
+    # Logs and spans carry the id of the request that submitted the job.
+    trace = tracing.start_request(
+        job.get("request_id") or job_id, f"job {job['kind']}", job_id=job_id, attempt=job["attempts"]
+    )
+    try:
+        # Jobs are background work: they queue behind live requests for provider budget.
+        with request_priority("batch"):
+            result = await _handlers[job["kind"]](payload)
+    except Exception as e:
+        trace.end(error=e)
+        if _is_retryable(e) and job["attempts"] < JOB_MAX_ATTEMPTS:
+            _counters["retried"] += 1
+            job["status"] = "queued"
+            _save(job)
+            delay = JOB_RETRY_BACKOFF_SEC * (2 ** (job["attempts"] - 1))
+            if isinstance(e, ProviderBusy):
+                delay = max(delay, e.retry_after)
+            logger.warning("Job %s (%s) attempt %d failed, retrying in %.1fs: %s",
+                           job_id, job["kind"], job["attempts"], delay, e)
+            _spawn(_requeue_later(job, delay))
+            return
+        logger.exception("Job %s (%s) failed: %s", job_id, job["kind"], e)
+        detail = e.detail if isinstance(e, HTTPException) else "Internal server error"
+        _finish(job, "failed", error=detail)
+        return
+    finally:
+        trace.detach()
+    trace.end()
+    _finish(job, "succeeded", result=result)
+
+
+async def _worker():
+    while True:
+        _, _, job_id = await _queue.get()
+        try:
+            await _run(job_id)
+        except Exception as e:
+            logger.exception("Job worker crashed on %s: %s", job_id, e)
+        finally:
+            _queue.task_done()
+
+
+def _fail_orphaned_jobs() -> int:
+    """
+    Fail jobs a previous process left queued or running. Their payloads and
+    queue entries died with it, so nothing would ever pick them up, and
+    pollers would see them as queued until the record expired.
+    """
+    orphaned = 0
+    for job_id in _job_store.keys():
+        job = _job_store.get(job_id)
+        if job is not None and job.get("status") in {"queued", "running"}:
+            _finish(job, "failed", error="Interrupted by restart.")
+            orphaned += 1
+    if orphaned:
+        logger.warning("Marked %d jobs interrupted by a restart as failed", orphaned)
+    return orphaned
+
+
+def start_job_workers():
+    global _queue
+    if _queue is None:
+        _fail_orphaned_jobs()
+        _queue = asyncio.PriorityQueue(maxsize=JOB_QUEUE_MAX)
+    while len(_workers) < JOB_WORKERS:
+        _workers.append(asyncio.create_task(_worker()))
+
+
+async def stop_job_workers():
+    global _queue
+    for task in _workers:
+        task.cancel()
+    for task in list(_background):
+        task.cancel()
+    await asyncio.gather(*_workers, *_background, return_exceptions=True)
+    _workers.clear()
+    _queue = None
+
+
+def job_queue_stats() -> Dict[str, Any]:
+    return {
+        **_counters,
+        "workers": len(_workers),
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "in_flight": len(_in_flight),
+    }
@@ -0,0 +1,174 @@
+import contextvars
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Dict
+
+import metrics
+from cache_store import build_cache, make_cache_key
+from provider_clients import get_groq_client
+from tracing import current_span, traced
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+REWRITE_MODEL = os.getenv("INTERVIEW_REWRITE_MODEL", "llama-3.1-8b-instant")
+REWRITE_TIMEOUT_SEC = _env_float("INTERVIEW_REWRITE_TIMEOUT_SEC", 1.5)
+REWRITE_FALLBACK_REPLY = "Could you walk me through that in a bit more detail?"
+
+ENGLISH_ONLY_INSTRUCTION = (
+    "Language: reply in English only, using Latin script. Do not use Hindi or Hinglish words "
+    "even if the candidate does."
+)
+
+# Romanized Hindi words that do not collide with English vocabulary, tech
+# names or common surnames (so no "matlab", "bata" or "wali"). A reply needs
+# HINGLISH_MIN_HITS of them before it is rewritten, so one stray proper noun
+# cannot replace a correct question with the fallback.
+HINGLISH_WORDS = frozenset({
+    "aap", "aapka", "aapke", "aapki", "accha", "acha", "achha", "bahut", "batao",
+    "bataiye", "bataye", "batayein", "bhai", "bilkul", "haan", "hai", "hain", "hoga", "hota",
+    "kaise", "kaisa", "karo", "karein", "karte", "kya", "kyun", "kyunki",
+    "mein", "nahi", "nahin", "sahayta", "samjha", "samjhe", "theek", "thik",
+    "tumhara", "wala", "yahaan", "yahan", "zaroor",
+})
+HINGLISH_MIN_HITS = _env_int("INTERVIEW_HINGLISH_MIN_HITS", 2)
+_WORD = re.compile(r"[a-z]+")
+_DEVANAGARI = re.compile("[\u0900-\u097f]")
+
+_rewrite_cache = build_cache(
+    "interview_rewrites",
+    env_prefix="INTERVIEW_REWRITE",
+    default_ttl_sec=24 * 3600,
+    default_max_entries=1024,
+)
+_rewrite_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="interview-rewrite")
+
+_lock = threading.Lock()
+_counters = {
+    "replies_checked": 0,
+    "non_english_detected": 0,
+    "rewrites": 0,
+    "rewrite_cache_hits": 0,
+    "rewrite_timeouts": 0,
+    "rewrite_failures": 0,
+    "fallback_replies": 0,
+    "rewrite_ms_total": 0.0,
+}
+
+REWRITE_TRIGGERS = metrics.counter(
+    "ai_engine_language_rewrites_total",
+    "Interview replies that needed an English rewrite, by how it was resolved",
+    ("outcome",),
+)
+
+
+def _count(name: str, amount: float = 1):
+    with _lock:
+        _counters[name] += amount
+
+
+def needs_english_rewrite(text: str) -> bool:
+    """Cheap local check: Devanagari script or at least HINGLISH_MIN_HITS romanized Hindi words."""
+    if _DEVANAGARI.search(text):
+        return True
+    hits = sum(1 for word in _WORD.findall(text.lower()) if word in HINGLISH_WORDS)
+    return hits >= HINGLISH_MIN_HITS
+
+
+def _rewrite(reply: str, key: str) -> str:
+    started_at = time.perf_counter()
+    try:
+        completion = get_groq_client().chat.completions.create(
+            model=REWRITE_MODEL,
+            messages=[
+                {
+                    "role": "system",
+                    "content": "Rewrite the following into natural professional English. Keep meaning same. "
+                    "Output only the rewritten text.",
+                },
+                {"role": "user", "content": reply},
+            ],
+            temperature=0.2,
+            max_tokens=180,
+        )
+        rewritten = (completion.choices[0].message.content or "").strip().strip('"')
+        if rewritten and not needs_english_rewrite(rewritten):
+            _rewrite_cache.set(key, rewritten)
+        return rewritten
+    except Exception:
+        _count("rewrite_failures")
+        raise
+    finally:
+        _count("rewrite_ms_total", (time.perf_counter() - started_at) * 1000)
+
+
+@traced("interview.english_guard")
+def enforce_english(reply: str, fallback: str = REWRITE_FALLBACK_REPLY) -> str:
+    """
+    Return reply unchanged when it is English. Otherwise use a cached
+    rewrite, or race a rewrite on a small model against
+    INTERVIEW_REWRITE_TIMEOUT_SEC (blocking the caller's worker for that
+    long) and return fallback if it loses. Callers pass a fallback that
+    keeps the turn's intent, e.g. a greeting or end-call prompt. A late
+    rewrite still lands in the cache.
+    """
+    _count("replies_checked")
+    if not needs_english_rewrite(reply):
+        return reply
+    _count("non_english_detected")
+    current_span().set(rewrite_needed=True)
+
+    key = make_cache_key(" ".join(reply.lower().split()))
+    cached = _rewrite_cache.get(key)
+    if cached:
+        _count("rewrite_cache_hits")
+        REWRITE_TRIGGERS.inc("cache_hit")
+        current_span().set(outcome="cache_hit")
+        return cached
+
+    future = _rewrite_executor.submit(contextvars.copy_context().run, _rewrite, reply, key)
+    try:
+        rewritten = future.result(timeout=REWRITE_TIMEOUT_SEC)
+    except FutureTimeout:
+        _count("rewrite_timeouts")
+        rewritten = ""
+    except Exception as e:
+        logger.warning("Interview reply rewrite failed: %s", e)
+        rewritten = ""
+
+    if rewritten and not needs_english_rewrite(rewritten):
+        _count("rewrites")
+        REWRITE_TRIGGERS.inc("rewritten")
+        current_span().set(outcome="rewritten")
+        return rewritten
+    _count("fallback_replies")
+    REWRITE_TRIGGERS.inc("fallback")
+    current_span().set(outcome="fallback")
+    return fallback
+
+
+def language_guard_stats() -> Dict[str, Any]:
+    with _lock:
+        stats = dict(_counters)
+    checked = stats["replies_checked"]
+    stats["rewrite_ms_total"] = round(stats["rewrite_ms_total"], 2)
+    stats["detection_rate"] = round(stats["non_english_detected"] / checked, 4) if checked else 0.0
+    return stats
@@ -0,0 +1,108 @@
+import asyncio
+import importlib
+import logging
+import os
+import sys
+import threading
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Route modules and the heavy libraries they use (provider SDKs, Pillow,
+# PyMuPDF) are only imported on first use or by an explicit warmup.
+ROUTE_MODULES = (
+    "groq_client",
+    "interviewer",
+    "gemini_client",
+    "interview_analyzer",
+    "gemini_resume",
+    "Assesment",
+)
+HEAVY_DEPENDENCIES = ("groq", "google.generativeai", "httpx", "PIL", "fitz")
+
+try:
+    IMPORT_BUDGET_MS = float(os.getenv("COLD_START_BUDGET_MS", 1500))
+except (TypeError, ValueError):
+    IMPORT_BUDGET_MS = 1500.0
+
+_lock = threading.Lock()
+_module_report: Dict[str, Dict[str, Any]] = {}
+_dependency_report: Dict[str, float] = {}
+_startup: Dict[str, Any] = {}
+
+
+def load_module(name: str) -> ModuleType:
+    module = sys.modules.get(name)
+    if module is not None and name in _module_report:
+        return module
+
+    with _lock:
+        if name in _module_report:
+            return sys.modules[name]
+        already_loaded = {dep for dep in HEAVY_DEPENDENCIES if dep in sys.modules}
+        started_at = time.perf_counter()
+        module = importlib.import_module(name)
+        import_ms = (time.perf_counter() - started_at) * 1000
+        _module_report[name] = {
+            "import_ms": round(import_ms, 2),
+            "pulled_in": [dep for dep in HEAVY_DEPENDENCIES if dep in sys.modules and dep not in already_loaded],
+        }
+
+    if import_ms > IMPORT_BUDGET_MS:
+        logger.warning("Lazy import of %s took %.0f ms (budget %.0f ms)", name, import_ms, IMPORT_BUDGET_MS)
+    else:
+        logger.info("Lazy import of %s took %.0f ms", name, import_ms)
+    return module
+
+
+async def load_module_async(name: str) -> ModuleType:
+    """Import a route module off the event loop the first time it is needed."""
+    if name in _module_report:
+        return sys.modules[name]
+    return await asyncio.get_running_loop().run_in_executor(None, load_module, name)
+
+
+def _load_dependency(name: str):
+    if name in _dependency_report:
+        return
+    started_at = time.perf_counter()
+    try:
+        importlib.import_module(name)
+    except ImportError as e:
+        logger.warning("Warmup could not import %s: %s", name, e)
+        return
+    _dependency_report[name] = round((time.perf_counter() - started_at) * 1000, 2)
+
+
+def warmup(names: Optional[Iterable[str]] = None, init_clients: bool = False) -> Dict[str, Any]:
+    """Import route modules and heavy dependencies ahead of traffic."""
+    for name in names or ROUTE_MODULES:
+        load_module(name)
+    for dependency in HEAVY_DEPENDENCIES:
+        _load_dependency(dependency)
+    if init_clients:
+        provider_clients = importlib.import_module("provider_clients")
+        provider_clients.get_groq_client()
+        try:
+            provider_clients.get_gemini_model("models/gemini-2.5-flash")
+        except ValueError as e:
+            logger.warning("Gemini warmup skipped: %s", e)
+    return startup_report()
+
+
+def mark_startup(phase: str, started_at: float):
+    _startup[phase] = round((time.perf_counter() - started_at) * 1000, 2)
+
+
+def startup_report() -> Dict[str, Any]:
+    total_ms = _startup.get("ready_ms", 0.0)
+    return {
+        "budget_ms": IMPORT_BUDGET_MS,
+        "startup": dict(_startup),
+        "within_budget": total_ms <= IMPORT_BUDGET_MS,
+        "modules": {name: dict(entry) for name, entry in _module_report.items()},
+        "dependencies": dict(_dependency_report),
+        "pending": [name for name in ROUTE_MODULES if name not in _module_report],
+    }
@@ -1,28 +1,84 @@
+import time
+
+_process_started_at = time.perf_counter()
+
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import os
+import json
+import asyncio
 import logging
 import uuid
 from datetime import datetime
 from dotenv import load_dotenv
-from gemini_client import process_image_with_gemini, generate_interview_prompt_with_gemini
-from interviewer import run_interview_chat
-from groq_client import chatbot, filter_fields_generator
-from interview_analyzer import analyze_interview_with_gemini
-from typing import List, Optional
-from gemini_resume import process_resume_analysis
-from Assesment import generate_interview_assessment_with_gemini, assess_candidate_response_with_gemini
+from typing import List, Literal, Optional
+from cache_store import cache_stats
+from caption_cache import caption_cache_stats
+from interview_memory import interview_memory_stats
+import interview_sessions
+import interview_speculation
+import job_queue
+import provider_gateway
+import rate_limiter
+import metrics
+import tracing
+from single_flight import coalesce, single_flight_stats
+import question_bank
+from assessment_scoring import score_with_answer_key
+from language_guard import language_guard_stats
+from matchmaker_cache import normalize_query, warm_filter_cache
+from matchmaker_rules import local_extractor_stats
+from lazy_modules import load_module, load_module_async, mark_startup, startup_report, warmup, IMPORT_BUDGET_MS
+from provider_clients import close_async_http_client
+from provider_pool import run_provider_call, iterate_provider_stream, provider_pool_stats, shutdown_provider_pool
+from contextlib import asynccontextmanager
 
 load_dotenv()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mark_startup("ready_ms", _process_started_at)
+    report = startup_report()
+    if not report["within_budget"]:
+        logger.warning("Cold start took %.0f ms (budget %.0f ms)", report["startup"]["ready_ms"], IMPORT_BUDGET_MS)
+    else:
+        logger.info("Cold start took %.0f ms", report["startup"]["ready_ms"])
+
+    if os.getenv("EAGER_WARMUP", "").strip().lower() in {"1", "true", "yes"}:
+        app.state.warmup = asyncio.get_running_loop().run_in_executor(None, warmup)
+
+    warmup_file = os.getenv("MATCHMAKER_WARMUP_FILE", "").strip()
+    if warmup_file:
+        app.state.matchmaker_warmup = asyncio.create_task(
+            run_provider_call("groq", _warm_matchmaker_cache, warmup_file)
+        )
+    job_queue.start_job_workers()
+    metrics.start_event_loop_monitor()
+    yield
+    await metrics.stop_event_loop_monitor()
+    await job_queue.stop_job_workers()
+    await close_async_http_client()
+    shutdown_provider_pool()
+
+
+def _warm_matchmaker_cache(warmup_file: str) -> int:
+    groq_client = load_module("groq_client")
+    return warm_filter_cache(warmup_file, groq_client.filter_fields_generator)
+
+
+app = FastAPI(lifespan=lifespan)
+mark_startup("app_import_ms", _process_started_at)
 logger = logging.getLogger(__name__)
 logging.basicConfig(
     level=os.getenv("LOG_LEVEL", "INFO").upper(),
-    format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
+    format="%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s",
 )
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(tracing.RequestIdLogFilter())
 
 required_env_vars = ["GEMINI_API_KEY", "GROQ_API_KEY"]
 missing_env_vars = [name for name in required_env_vars if not os.getenv(name)]
@@ -47,6 +103,13 @@ app.add_middleware(
 )
 
 
+REQUEST_LATENCY = metrics.histogram(
+    "ai_engine_request_duration_seconds",
+    "Time to the response headers, per route",
+    ("route", "method", "status"),
+)
+
+
 @app.middleware("http")
 async def attach_request_id_and_optional_auth(request: Request, call_next):
     request_id = request.headers.get("x-request-id") or str(uuid.uuid4())
@@ -57,11 +120,53 @@ async def attach_request_id_and_optional_auth(request: Request, call_next):
         if provided_api_key != service_api_key:
             return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
 
-    response = await call_next(request)
+    trace = tracing.start_request(
+        request_id,
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent", ""),
+        force_sample=request.headers.get("x-trace-sample") == "1",
+        http_method=request.method,
+        http_path=request.url.path,
+    )
+    budget_token = provider_gateway.start_route_budget(request.url.path)
+    priority_token = rate_limiter.set_request_priority(rate_limiter.route_priority(request.url.path))
+    started_at = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    except Exception as e:
+        trace.end(error=e, http_status=500)
+        raise
+    finally:
+        rate_limiter.reset_request_priority(priority_token)
+        provider_gateway.reset_route_budget(budget_token)
+        trace.detach()
+        # Route template, not the raw path, so session and job ids do not explode cardinality.
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - started_at,
+            getattr(route, "path", "unmatched"),
+            request.method,
+            status_code,
+        )
     response.headers["x-request-id"] = request_id
+    if trace.root is not None:
+        trace.root.set(http_route=getattr(route, "path", "unmatched"), http_status=status_code)
+        response.headers["traceparent"] = trace.traceparent
+        response.body_iterator = _end_trace_after_body(response.body_iterator, trace)
     return response
 
 
+async def _end_trace_after_body(body, trace: tracing.RequestTrace):
+    # Streamed replies keep producing spans after the headers go out.
+    try:
+        async for chunk in body:
+            yield chunk
+    finally:
+        trace.end()
+
+
 @app.get("/health")
 async def health_check():
     return {
@@ -71,6 +176,41 @@ async def health_check():
     }
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        "status": "ok",
+        "provider_pool": provider_pool_stats(),
+        "provider_gateway": provider_gateway.provider_gateway_stats(),
+        "rate_limits": rate_limiter.rate_limiter_stats(),
+        "single_flight": single_flight_stats(),
+        "tracing": tracing.tracing_stats(),
+        "caches": cache_stats(),
+        "caption_cache": caption_cache_stats(),
+        "matchmaker": local_extractor_stats(),
+        "interview_memory": interview_memory_stats(),
+        "interview_language": language_guard_stats(),
+        "interview_speculation": interview_speculation.speculation_stats(),
+        "jobs": job_queue.job_queue_stats(),
+        "question_bank": question_bank.question_bank_stats(),
+        "startup": startup_report(),
+    }
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/warmup")
+async def warmup_endpoint(init_clients: bool = True):
+    report = await asyncio.get_running_loop().run_in_executor(None, warmup, None, init_clients)
+    return {
+        "status": "ok",
+        "startup": report,
+    }
+
+
 @app.get("/")
 async def root():
     return {
@@ -85,6 +225,20 @@ async def global_exception_handler(request: Request, exc: Exception):
     logger.exception("Unhandled exception on %s: %s", request.url.path, exc)
     return JSONResponse(status_code=500, content={"detail": "Internal server error"})
 
+
+def _server_error(exc: BaseException, detail: str = "Internal server error") -> HTTPException:
+    """
+    500 for an unexpected failure, unless it was caused by a provider call
+    the rate limiter shed; that one goes back to the client as 429/503.
+    """
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, rate_limiter.ProviderBusy):
+            return exc
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return HTTPException(status_code=500, detail=detail)
+
 class ImageRequest(BaseModel):
     image: str
     instruction: str = "concise"
@@ -95,9 +249,10 @@ async def generate_endpoint(request: ImageRequest):
         if not request.image:
             raise HTTPException(status_code=400, detail="Image input is missing")
         
-        result = process_image_with_gemini(
-            image_input=request.image, 
-            instruction=request.instruction
+        gemini_client = await load_module_async("gemini_client")
+        result = await gemini_client.process_image_with_gemini(
+            image_input=request.image,
+            instruction=request.instruction,
         )
         return {
             "status": "success",
@@ -108,7 +263,39 @@ async def generate_endpoint(request: ImageRequest):
         raise
     except Exception as e:
         logger.exception("/generate failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
+
+class BatchImageRequest(BaseModel):
+    images: List[ImageRequest]
+
+
+CAPTION_BATCH_MAX_ITEMS = int(os.getenv("CAPTION_BATCH_MAX_ITEMS", 20))
+
+
+@app.post("/generate/batch")
+async def generate_batch_endpoint(request: BatchImageRequest):
+    try:
+        if not request.images:
+            raise HTTPException(status_code=400, detail="Image list is empty")
+        if len(request.images) > CAPTION_BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=400, detail=f"At most {CAPTION_BATCH_MAX_ITEMS} images per batch")
+
+        gemini_client = await load_module_async("gemini_client")
+        results = await gemini_client.caption_images_batch(
+            [(item.image, item.instruction) for item in request.images]
+        )
+        return {
+            "status": "success",
+            "results": [
+                {"index": index, "style_used": item.instruction, **result}
+                for index, (item, result) in enumerate(zip(request.images, results))
+            ],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("/generate/batch failed: %s", e)
+        raise _server_error(e)
 
 class ChatMessage(BaseModel):
     role: str
@@ -135,6 +322,30 @@ class InterviewerRequest(BaseModel):
     interview_prompt: str = Field(default="")
 
 
+class InterviewSessionCreateRequest(BaseModel):
+    company: str = Field(default="Tech Company")
+    role_name: str = Field(default="Software Engineer")
+    topics: str | List[str] = Field(default="General")
+    resume_summary: str = Field(default="No resume provided")
+    difficulty: str = Field(default="moderate")
+    interview_prompt: str = Field(default="")
+
+
+class InterviewSessionTurnRequest(BaseModel):
+    message: str
+    interview_duration_sec: int = Field(default=0)
+
+
+class InterviewSessionPartialRequest(BaseModel):
+    partial_text: str
+    interview_duration_sec: int = Field(default=0)
+
+
+class InterviewSessionEndRequest(BaseModel):
+    interview_duration_sec: int = Field(default=0)
+    analyze: bool = Field(default=True)
+
+
 class GenerateInterviewPromptRequest(BaseModel):
     company: str = Field(default="Tech Company")
     role_name: str = Field(default="Software Engineer")
@@ -147,7 +358,10 @@ class GenerateInterviewPromptRequest(BaseModel):
 async def generate_interview_prompt_endpoint(request: GenerateInterviewPromptRequest):
     try:
         topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
-        prompt = generate_interview_prompt_with_gemini(
+        gemini_client = await load_module_async("gemini_client")
+        prompt = await run_provider_call(
+            "gemini",
+            gemini_client.generate_interview_prompt_with_gemini,
             company=request.company,
             role_name=request.role_name,
             topics=topics_text,
@@ -162,7 +376,7 @@ async def generate_interview_prompt_endpoint(request: GenerateInterviewPromptReq
         raise
     except Exception as e:
         logger.exception("/generateIP failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
 
 class TranscriptItem(BaseModel):
     id: Optional[str | float | int] = None
@@ -183,7 +397,8 @@ async def chatbot_endpoint(request: ChatBotRequest):
         if not request.message:
             raise HTTPException(status_code=400, detail="Message cannot be empty")
 
-        reply = chatbot(request.message)
+        groq_client = await load_module_async("groq_client")
+        reply = await run_provider_call("groq", groq_client.chatbot, request.message)
         return {
             "status": "success",
             "reply": reply,
@@ -192,7 +407,18 @@ async def chatbot_endpoint(request: ChatBotRequest):
         raise
     except Exception as e:
         logger.exception("/chat failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
+
+
+async def _matchmaker_filters(prompt: str) -> dict:
+    # Popular queries arrive in bursts before the filter cache has them;
+    # identical ones in flight share one extraction.
+    groq_client = await load_module_async("groq_client")
+    return await coalesce(
+        "matchmaker_filters",
+        normalize_query(prompt),
+        lambda: run_provider_call("groq", groq_client.filter_fields_generator, prompt),
+    )
 
 
 @app.post("/matchmaker-filters")
@@ -201,7 +427,7 @@ async def matchmaker_filters_endpoint(request: MatchmakerFilterRequest):
         if not request.prompt or not request.prompt.strip():
             raise HTTPException(status_code=400, detail="Prompt cannot be empty")
 
-        filters = filter_fields_generator(request.prompt)
+        filters = await _matchmaker_filters(request.prompt)
         return {
             "status": "success",
             "filters": filters,
@@ -210,76 +436,339 @@ async def matchmaker_filters_endpoint(request: MatchmakerFilterRequest):
         raise
     except Exception as e:
         logger.exception("/matchmaker-filters failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
+
+def _interview_chat_kwargs(request: InterviewerRequest) -> dict:
+    formatted_history = [
+        {"role": m.role, "content": m.content} for m in request.history
+    ]
+
+    topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+
+    return {
+        "user_input": request.message,
+        "chat_history": formatted_history,
+        "company": request.company,
+        "role_name": request.role_name,
+        "topics": topics_text,
+        "resume_summary": request.resume_summary,
+        "interview_duration_sec": request.interview_duration_sec,
+        "difficulty": request.difficulty,
+        "end_call_prompt_count": request.end_call_prompt_count,
+        "interview_prompt": request.interview_prompt,
+    }
+
+
+def _interview_chat_response(result: dict) -> dict:
+    return {
+        "reply": result.get("reply", ""),
+        "allotted_time_sec": result.get("allotted_time_sec", 45),
+        "interview_ended": result.get("interview_ended", False),
+        "end_call_prompted": result.get("end_call_prompted", False),
+        "endCallPromptCount": result.get("end_call_prompt_count", 0),
+    }
+
 
 @app.post("/interviewer")
 async def interviewer_chat_endpoint(request: InterviewerRequest):
     try:
         if not request.message:
             raise HTTPException(status_code=400, detail="Message cannot be empty")
-        
-        formatted_history = [
-            {"role": m.role, "content": m.content} for m in request.history
-        ]
-
-        topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
 
-        result = run_interview_chat(
-            user_input=request.message,
-            chat_history=formatted_history,
-            company=request.company,
-            role_name=request.role_name,
-            topics=topics_text,
-            resume_summary=request.resume_summary,
-            interview_duration_sec=request.interview_duration_sec,
-            difficulty=request.difficulty,
-            end_call_prompt_count=request.end_call_prompt_count,
-            interview_prompt=request.interview_prompt,
-        )
+        interviewer = await load_module_async("interviewer")
+        result = await run_provider_call("groq", interviewer.run_interview_chat, **_interview_chat_kwargs(request))
 
         return {
             "status": "success",
-            "reply": result.get("reply", ""),
-            "allotted_time_sec": result.get("allotted_time_sec", 45),
-            "interview_ended": result.get("interview_ended", False),
-            "end_call_prompted": result.get("end_call_prompted", False),
-            "endCallPromptCount": result.get("end_call_prompt_count", 0),
+            **_interview_chat_response(result),
         }
     except HTTPException:
         raise
     except Exception as e:
         logger.exception("/interviewer failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
+
+
+def _interview_stream_response(http_request: Request, chat_kwargs, on_final=None, lock=None, draft=None) -> StreamingResponse:
+    """
+    chat_kwargs may be a callable, in which case it runs after the lock is
+    taken so session state is read by the turn that will update it. draft,
+    if given, is awaited first; a non-empty result is sent as one delta
+    instead of calling the provider.
+    """
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+
+    def encode(frame: dict) -> str:
+        body = json.dumps(frame, ensure_ascii=False)
+        if use_sse:
+            return f"event: {frame['type']}\ndata: {body}\n\n"
+        return body + "\n"
+
+    async def frames():
+        acquired = False
+        try:
+            if lock is not None:
+                await lock.acquire()
+                acquired = True
+            kwargs = await asyncio.to_thread(chat_kwargs) if callable(chat_kwargs) else chat_kwargs
+            drafted = await draft() if draft is not None else None
+            if drafted:
+                events = _drafted_events(drafted)
+            else:
+                interviewer = await load_module_async("interviewer")
+                events = iterate_provider_stream("groq", interviewer.stream_interview_chat, **kwargs)
+            async for event in events:
+                if event.get("type") == "final":
+                    if on_final is not None:
+                        on_final(event)
+                    yield encode({
+                        "type": "final",
+                        "status": "success",
+                        **_interview_chat_response(event),
+                        "reply_replaced": event.get("reply_replaced", False),
+                    })
+                else:
+                    yield encode(event)
+        except HTTPException as e:
+            yield encode({"type": "error", "detail": e.detail})
+        except Exception as e:
+            logger.exception("%s failed: %s", http_request.url.path, e)
+            yield encode({"type": "error", "detail": "Internal server error"})
+        finally:
+            if acquired:
+                lock.release()
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def _drafted_events(result: dict):
+    yield {"type": "delta", "text": result.get("reply", "")}
+    yield {"type": "final", **result, "reply_replaced": False}
+
+
+@app.post("/interviewer/stream")
+async def interviewer_chat_stream_endpoint(request: InterviewerRequest, http_request: Request):
+    """
+    Streams the interviewer reply as it is generated. Clients sending
+    `Accept: text/event-stream` get Server-Sent Events, everyone else gets
+    NDJSON. Frames are {"type": "delta", "text"}, then a single
+    {"type": "final", ...} frame with the same fields as /interviewer.
+    """
+    if not request.message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    return _interview_stream_response(http_request, _interview_chat_kwargs(request))
+
+
+def _load_interview_session(session_id: str) -> dict:
+    session = interview_sessions.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Interview session not found or expired.")
+    return session
+
+
+@app.post("/interviewer/sessions")
+async def create_interview_session(request: InterviewSessionCreateRequest):
+    """
+    Stores the prompt, resume summary and interview settings once so later
+    turns only send the session id and the new message.
+    """
+    topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+    session = await asyncio.to_thread(
+        interview_sessions.create_session,
+        company=request.company,
+        role_name=request.role_name,
+        topics=topics_text,
+        resume_summary=request.resume_summary,
+        difficulty=request.difficulty,
+        interview_prompt=request.interview_prompt,
+    )
+    return {"status": "success", **interview_sessions.session_summary(session)}
+
+
+@app.get("/interviewer/sessions/{session_id}")
+async def get_interview_session(session_id: str):
+    session = await asyncio.to_thread(_load_interview_session, session_id)
+    return {
+        "status": "success",
+        **interview_sessions.session_summary(session),
+        "history": session["history"],
+    }
+
+
+@app.post("/interviewer/sessions/{session_id}/turn")
+async def interview_session_turn(session_id: str, request: InterviewSessionTurnRequest):
+    if not request.message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
 
-@app.post("/analyze")
-async def analyze_interview(request: InterviewAnalysisRequest):
     try:
-        transcript_list = [
-            {"speaker": item.speaker, "text": item.text, "id": item.id}
-            for item in request.transcript
-        ]
+        async with interview_sessions.session_turn_lock(session_id):
+            session = await asyncio.to_thread(_load_interview_session, session_id)
+            if session["interview_ended"]:
+                raise HTTPException(status_code=409, detail="Interview session has already ended.")
+
+            started_at = time.perf_counter()
+            result = await interview_speculation.take_draft(session["session_id"], request.message, len(session["history"]))
+            if result is None:
+                interviewer = await load_module_async("interviewer")
+                chat_kwargs = interview_sessions.session_chat_kwargs(session, request.message, request.interview_duration_sec)
+                result = await run_provider_call("groq", interviewer.run_interview_chat, **chat_kwargs)
+                interview_speculation.record_turn_latency(started_at, speculative=False)
+            else:
+                interview_speculation.record_turn_latency(started_at, speculative=True)
+            await asyncio.to_thread(interview_sessions.record_turn, session, request.message, result)
 
-        topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+        return {
+            "status": "success",
+            "session_id": session["session_id"],
+            **_interview_chat_response(result),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("/interviewer/sessions turn failed: %s", e)
+        raise _server_error(e)
+
+
+@app.post("/interviewer/sessions/{session_id}/turn/stream")
+async def interview_session_turn_stream(session_id: str, request: InterviewSessionTurnRequest, http_request: Request):
+    """Streaming variant of the session turn, framed like /interviewer/stream."""
+    if not request.message:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    # Fail fast with a real status code; the check is repeated under the lock.
+    await asyncio.to_thread(_load_interview_session, session_id)
+    current = {}
+
+    def chat_kwargs() -> dict:
+        session = _load_interview_session(session_id)
+        if session["interview_ended"]:
+            raise HTTPException(status_code=409, detail="Interview session has already ended.")
+        current["session"] = session
+        return interview_sessions.session_chat_kwargs(session, request.message, request.interview_duration_sec)
+
+    async def draft():
+        session = current["session"]
+        return await interview_speculation.take_draft(session["session_id"], request.message, len(session["history"]))
+
+    def on_final(event: dict):
+        interview_sessions.record_turn(current["session"], request.message, event)
+
+    lock = interview_sessions.session_turn_lock(session_id)
+    return _interview_stream_response(http_request, chat_kwargs, on_final=on_final, lock=lock, draft=draft)
+
+
+@app.post("/interviewer/sessions/{session_id}/partial")
+async def interview_session_partial(session_id: str, request: InterviewSessionPartialRequest):
+    """
+    Optional speculative mode. Clients post the candidate's partial
+    transcript while they are still speaking; once it stops changing the
+    engine warms the next turn and drafts a reply. A following /turn whose
+    message matches the partial reuses that draft, anything else cancels it.
+    """
+    session = await asyncio.to_thread(_load_interview_session, session_id)
+    if session["interview_ended"]:
+        raise HTTPException(status_code=409, detail="Interview session has already ended.")
+    if not request.partial_text.strip():
+        return {"status": "success", "state": "ignored"}
+
+    chat_kwargs = interview_sessions.session_chat_kwargs(session, request.partial_text, request.interview_duration_sec)
+    chat_kwargs["chat_history"] = list(session["history"])
+
+    async def prepare():
+        interviewer = await load_module_async("interviewer")
+        await asyncio.to_thread(interviewer.prepare_interview_turn, chat_kwargs["chat_history"])
+
+    async def draft():
+        interviewer = await load_module_async("interviewer")
+        return await run_provider_call("groq", interviewer.run_interview_chat, **chat_kwargs)
+
+    state = interview_speculation.submit_partial(
+        session["session_id"], request.partial_text, len(session["history"]), prepare, draft
+    )
+    return {"status": "success", **state}
+
+
+@app.post("/interviewer/sessions/{session_id}/end")
+async def end_interview_session(session_id: str, request: InterviewSessionEndRequest):
+    """
+    Ends a session and, unless analyze is false, runs the /analyze pipeline
+    on the stored transcript. The session is dropped once that succeeds.
+    """
+    async with interview_sessions.session_turn_lock(session_id):
+        session = await asyncio.to_thread(_load_interview_session, session_id)
+        analysis = None
+        if request.analyze:
+            analysis = await _run_interview_analysis(
+                transcript=interview_sessions.session_transcript(session),
+                company=session["company"],
+                role_name=session["role_name"],
+                topics=session["topics"],
+                resume_summary=session["resume_summary"],
+                interview_duration_sec=request.interview_duration_sec,
+                route="/interviewer/sessions end",
+            )
+        await asyncio.to_thread(interview_sessions.delete_session, session["session_id"])
+        interview_speculation.discard(session["session_id"])
+        session["interview_ended"] = True
+
+    return {
+        "status": "success",
+        **interview_sessions.session_summary(session),
+        "analysis": analysis,
+    }
+
+
+@app.delete("/interviewer/sessions/{session_id}")
+async def delete_interview_session(session_id: str):
+    removed = await asyncio.to_thread(interview_sessions.delete_session, session_id)
+    interview_speculation.discard(session_id.strip().lower())
+    if not removed:
+        raise HTTPException(status_code=404, detail="Interview session not found or expired.")
+    return {"status": "success"}
 
-        result = analyze_interview_with_gemini(
-            transcript=transcript_list,
-            company=request.company,
-            role_name=request.role_name,
-            topics=topics_text,
-            resume_summary=request.resume_summary,
-            interview_duration_sec=request.interview_duration_sec
-        )
+
+async def _run_interview_analysis(*, route: str = "/analyze", **analysis_kwargs) -> dict:
+    try:
+        interview_analyzer = await load_module_async("interview_analyzer")
+        result = await interview_analyzer.analyze_interview(**analysis_kwargs)
 
         if "error" in result:
-            logger.error("/analyze provider error: %s", result["error"])
+            logger.error("%s provider error: %s", route, result["error"])
             raise HTTPException(status_code=500, detail="Internal server error")
 
         return result
     except HTTPException:
         raise
     except Exception as e:
-        logger.exception("/analyze failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        logger.exception("%s failed: %s", route, e)
+        raise _server_error(e)
+
+async def _analyze(request: InterviewAnalysisRequest) -> dict:
+    transcript_list = [
+        {"speaker": item.speaker, "text": item.text, "id": item.id}
+        for item in request.transcript
+    ]
+
+    topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+
+    return await _run_interview_analysis(
+        transcript=transcript_list,
+        company=request.company,
+        role_name=request.role_name,
+        topics=topics_text,
+        resume_summary=request.resume_summary,
+        interview_duration_sec=request.interview_duration_sec
+    )
+
+
+@app.post("/analyze")
+async def analyze_interview(request: InterviewAnalysisRequest):
+    return await _analyze(request)
 
 @app.post("/resumeanalyzer")
 async def analyze_resume(file: UploadFile = File(...)):
@@ -287,13 +776,29 @@ async def analyze_resume(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Please upload a PDF file.")
     
     try:
-        overview = await process_resume_analysis(file)
-        return {"overview": overview}
+        gemini_resume = await load_module_async("gemini_resume")
+        return await gemini_resume.process_resume_analysis(file)
     except HTTPException:
         raise
     except Exception as e:
         logger.exception("/resumeanalyzer failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal Server Error during analysis.")
+        raise _server_error(e, "Internal Server Error during analysis.")
+
+
+@app.delete("/resumeanalyzer/cache/{content_hash}")
+async def invalidate_resume_analysis(content_hash: str):
+    gemini_resume = await load_module_async("gemini_resume")
+    removed = await asyncio.to_thread(gemini_resume.invalidate_resume_cache, content_hash)
+    if not removed:
+        raise HTTPException(status_code=404, detail="No cached analysis for this resume.")
+    return {"status": "success", "removed": removed}
+
+
+@app.delete("/resumeanalyzer/cache")
+async def clear_resume_analysis_cache():
+    gemini_resume = await load_module_async("gemini_resume")
+    removed = await asyncio.to_thread(gemini_resume.invalidate_resume_cache)
+    return {"status": "success", "removed": removed}
 
 
 class QuestionItem(BaseModel):
@@ -320,53 +825,149 @@ class AssessResponseRequest(BaseModel):
     difficulty: str = Field(default="moderate")
     user_responses: List[str]
     questions_asked: List[QuestionItem]
+    # Answer-key scoring is local; the written feedback is "async" (a job
+    # polled via feedback_job_id), "sync" or "none" (templated text only).
+    narrative: Literal["async", "sync", "none"] = Field(default="async")
+
+async def _generate_assessment(request: AssessmentRequest) -> dict:
+    topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+    assesment = await load_module_async("Assesment")
+    assessment = await question_bank.build_assessment(
+        generate=assesment.generate_interview_assessment_with_gemini,
+        company=request.company,
+        role_name=request.role_name,
+        topics=topics_text,
+        difficulty=request.difficulty,
+        noOfQuestions=request.noOfQuestions,
+        totalTime=request.totalTime
+    )
+    if "error" in assessment:
+        logger.error("/generate_assessment provider error: %s", assessment["error"])
+        raise HTTPException(status_code=500, detail="Internal server error")
+    return assessment
+
+
+async def _assess_response(request: AssessResponseRequest) -> dict:
+    topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
+    questions_list = [q.model_dump() for q in request.questions_asked]
+
+    keys = await asyncio.to_thread(question_bank.get_question_bank().answer_keys, [q.question for q in request.questions_asked])
+    if request.user_responses and keys and all(keys):
+        report = score_with_answer_key(questions_list, request.user_responses, keys, request.difficulty)
+        return await _attach_assessment_feedback(report, request, topics_text)
+
+    assesment = await load_module_async("Assesment")
+    assessment = await run_provider_call(
+        "gemini",
+        assesment.assess_candidate_response_with_gemini,
+        company=request.company,
+        role_name=request.role_name,
+        topics=topics_text,
+        resume_summary=request.resume_summary,
+        difficulty=request.difficulty,
+        user_responses=request.user_responses,
+        questions_asked=questions_list
+    )
+    if "error" in assessment:
+        logger.error("/assess_response provider error: %s", assessment["error"])
+        raise HTTPException(status_code=500, detail="Internal server error")
+    assessment["scoring"] = "model"
+    return assessment
+
+
+async def _assessment_feedback(payload: dict) -> dict:
+    assesment = await load_module_async("Assesment")
+    narrative = await run_provider_call("gemini", assesment.write_assessment_feedback_with_gemini, **payload)
+    if "error" in narrative:
+        raise RuntimeError(narrative["error"])
+    return narrative
+
+
+async def _attach_assessment_feedback(report: dict, request: AssessResponseRequest, topics_text: str) -> dict:
+    payload = {
+        "company": request.company,
+        "role_name": request.role_name,
+        "topics": topics_text,
+        "resume_summary": request.resume_summary,
+        "report": report,
+    }
+    try:
+        if request.narrative == "sync":
+            report.update(await _assessment_feedback(payload))
+        elif request.narrative == "async":
+            report["feedback_job_id"] = job_queue.submit_job("assessment_feedback", payload, priority="low")["job_id"]
+    except Exception as e:
+        # Scores are already final; keep the templated feedback.
+        logger.warning("Assessment feedback unavailable: %s", e)
+    return report
+
 
 @app.post("/generate_assessment")
 async def generate_assessment(request: AssessmentRequest):
     try:
-        topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
-        assessment = generate_interview_assessment_with_gemini(
-            company=request.company,
-            role_name=request.role_name,
-            topics=topics_text,
-            difficulty=request.difficulty,
-            noOfQuestions=request.noOfQuestions,
-            totalTime=request.totalTime
-        )
-        if "error" in assessment:
-            logger.error("/generate_assessment provider error: %s", assessment["error"])
-            raise HTTPException(status_code=500, detail="Internal server error")
-        return assessment
+        return await _generate_assessment(request)
     except HTTPException:
         raise
     except Exception as e:
         logger.exception("/generate_assessment failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
 
 @app.post("/assess_response")
 async def assess_response(request: AssessResponseRequest):
     try:
-        topics_text = ", ".join(request.topics) if isinstance(request.topics, list) else request.topics
-        questions_list = [q.model_dump() for q in request.questions_asked]
-
-        assessment = assess_candidate_response_with_gemini(
-            company=request.company,
-            role_name=request.role_name,
-            topics=topics_text,
-            resume_summary=request.resume_summary,
-            difficulty=request.difficulty,
-            user_responses=request.user_responses,
-            questions_asked=questions_list
-        )
-        if "error" in assessment:
-            logger.error("/assess_response provider error: %s", assessment["error"])
-            raise HTTPException(status_code=500, detail="Internal server error")
-        return assessment
+        return await _assess_response(request)
     except HTTPException:
         raise
     except Exception as e:
         logger.exception("/assess_response failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
+
+
+# Queued variants of the slow Gemini routes. Submitting returns 202 with a
+# job id at once; the result is polled from /jobs/{job_id} or POSTed to
+# callback_url when the job finishes.
+job_queue.register_job_type("analyze", lambda payload: _analyze(InterviewAnalysisRequest.model_validate(payload)))
+job_queue.register_job_type(
+    "generate_assessment", lambda payload: _generate_assessment(AssessmentRequest.model_validate(payload))
+)
+job_queue.register_job_type(
+    "assess_response", lambda payload: _assess_response(AssessResponseRequest.model_validate(payload))
+)
+job_queue.register_job_type("assessment_feedback", _assessment_feedback)
+
+
+def _submit_job(kind: str, request: BaseModel, priority: str, callback_url: Optional[str]) -> JSONResponse:
+    job = job_queue.submit_job(kind, request.model_dump(), priority=priority, callback_url=callback_url)
+    return JSONResponse(status_code=202, content={"status": "accepted", **job, "poll_url": f"/jobs/{job['job_id']}"})
+
+
+@app.post("/jobs/analyze")
+async def submit_analyze_job(request: InterviewAnalysisRequest, priority: str = "normal", callback_url: Optional[str] = None):
+    return _submit_job("analyze", request, priority, callback_url)
+
+
+@app.post("/jobs/generate_assessment")
+async def submit_generate_assessment_job(request: AssessmentRequest, priority: str = "normal", callback_url: Optional[str] = None):
+    return _submit_job("generate_assessment", request, priority, callback_url)
+
+
+@app.post("/jobs/assess_response")
+async def submit_assess_response_job(request: AssessResponseRequest, priority: str = "normal", callback_url: Optional[str] = None):
+    return _submit_job("assess_response", request, priority, callback_url)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    job = await asyncio.to_thread(job_queue.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job_queue.public_job(job)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    await asyncio.to_thread(job_queue.cancel_job, job_id)
+    return {"status": "success"}
 
 @app.post("/matchmaker")
 async def matchmaker_filter(request: MatchmakerFilterRequest):
@@ -374,7 +975,7 @@ async def matchmaker_filter(request: MatchmakerFilterRequest):
         if not request.prompt or not request.prompt.strip():
             raise HTTPException(status_code=400, detail="Prompt cannot be empty")
 
-        filters = filter_fields_generator(request.prompt)
+        filters = await _matchmaker_filters(request.prompt)
         return {
             "status": "success",
             "filters": filters,
@@ -383,7 +984,7 @@ async def matchmaker_filter(request: MatchmakerFilterRequest):
         raise
     except Exception as e:
         logger.exception("/matchmaker-filters failed: %s", e)
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise _server_error(e)
 
 if __name__ == "__main__":
     server_host = os.getenv("SERVER_HOST", "0.0.0.0")
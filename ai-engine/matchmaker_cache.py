@@ -0,0 +1,75 @@
+import copy
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from cache_store import build_cache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+_filter_cache = build_cache(
+    "matchmaker_filters",
+    env_prefix="MATCHMAKER_FILTER",
+    default_ttl_sec=24 * 3600,
+    default_max_entries=2048,
+)
+
+# Keep characters that carry meaning in skill names (c++, c#, node.js).
+_QUERY_NOISE = re.compile(r"[^\w\s+#.]")
+
+
+def normalize_query(text: str) -> str:
+    lowered = _QUERY_NOISE.sub(" ", (text or "").lower())
+    return " ".join(token.strip(".") for token in lowered.split() if token.strip("."))
+
+
+def _filter_cache_key(provider: str, query: str, context: str) -> str:
+    return make_cache_key(provider, normalize_query(query), context.strip())
+
+
+def get_cached_filters(provider: str, query: str, context: str = "") -> Optional[Dict[str, Any]]:
+    cached = _filter_cache.get(_filter_cache_key(provider, query, context))
+    return copy.deepcopy(cached) if cached is not None else None
+
+
+def store_cached_filters(provider: str, query: str, context: str, filters: Dict[str, Any]):
+    _filter_cache.set(_filter_cache_key(provider, query, context), copy.deepcopy(filters))
+
+
+def warm_filter_cache(path: str | Path, generator: Callable[..., Dict[str, Any]]) -> int:
+    """
+    Pre-populate the filter cache by running `generator` over popular
+    queries. The file is either plain text with one query per line or a
+    JSON list of strings / {"query": ..., "profile": {...}} objects.
+    """
+    source = Path(path)
+    if not source.is_file():
+        logger.warning("Matchmaker warmup file not found: %s", source)
+        return 0
+
+    raw = source.read_text(encoding="utf-8")
+    try:
+        entries = json.loads(raw)
+    except ValueError:
+        entries = [line for line in raw.splitlines() if line.strip()]
+    if not isinstance(entries, list):
+        entries = []
+
+    warmed = 0
+    for entry in entries:
+        if isinstance(entry, dict):
+            query, profile = str(entry.get("query") or ""), entry.get("profile")
+        else:
+            query, profile = str(entry), None
+        if not query.strip():
+            continue
+        try:
+            generator(query, profile)
+            warmed += 1
+        except Exception as e:
+            logger.warning("Matchmaker warmup failed for %r: %s", query, e)
+
+    logger.info("Matchmaker filter cache warmed with %d queries from %s", warmed, source)
+    return warmed
@@ -0,0 +1,312 @@
+import difflib
+import os
+import re
+from typing import Any, Dict, List, Tuple
+
+try:
+    LOCAL_CONFIDENCE_THRESHOLD = float(os.getenv("MATCHMAKER_LOCAL_CONFIDENCE", 0.75))
+except (TypeError, ValueError):
+    LOCAL_CONFIDENCE_THRESHOLD = 0.75
+
+SKILLS = {
+    "React": ["react", "reactjs", "react.js"],
+    "Node.js": ["node", "nodejs", "node.js", "node js"],
+    "Express": ["express", "expressjs", "express.js", "express js"],
+    "Next.js": ["next", "nextjs", "next.js", "next js"],
+    "Vue": ["vue", "vuejs", "vue.js"],
+    "Angular": ["angular", "angularjs"],
+    "JavaScript": ["javascript", "js"],
+    "TypeScript": ["typescript", "ts"],
+    "Python": ["python", "py"],
+    "Java": ["java"],
+    "C++": ["c++", "cpp"],
+    "C#": ["c#", "csharp"],
+    "Go": ["golang"],
+    "Rust": ["rust"],
+    "Kotlin": ["kotlin"],
+    "Swift": ["swift"],
+    "Flutter": ["flutter"],
+    "Dart": ["dart"],
+    "Android": ["android"],
+    "iOS": ["ios"],
+    "React Native": ["react native"],
+    "Django": ["django"],
+    "Flask": ["flask"],
+    "FastAPI": ["fastapi"],
+    "Spring Boot": ["spring", "springboot", "spring boot"],
+    "HTML": ["html", "html5"],
+    "CSS": ["css", "css3"],
+    "Tailwind CSS": ["tailwind", "tailwindcss"],
+    "SQL": ["sql"],
+    "PostgreSQL": ["postgres", "postgresql"],
+    "MySQL": ["mysql"],
+    "MongoDB": ["mongo", "mongodb"],
+    "Firebase": ["firebase"],
+    "AWS": ["aws"],
+    "Azure": ["azure"],
+    "GCP": ["gcp", "google cloud"],
+    "Docker": ["docker"],
+    "Kubernetes": ["kubernetes", "k8s"],
+    "Git": ["git", "github"],
+    "Linux": ["linux"],
+    "DevOps": ["devops"],
+    "Machine Learning": ["ml", "machine learning"],
+    "Deep Learning": ["dl", "deep learning"],
+    "Data Science": ["data science", "data scientist"],
+    "Data Analysis": ["data analysis", "data analyst", "analytics"],
+    "TensorFlow": ["tensorflow"],
+    "PyTorch": ["pytorch"],
+    "NLP": ["nlp"],
+    "Computer Vision": ["computer vision", "cv", "opencv"],
+    "DSA": ["dsa", "data structures", "algorithms"],
+    "Figma": ["figma"],
+    "UI/UX": ["ui", "ux", "ui/ux", "uiux"],
+    "Blockchain": ["blockchain", "web3", "solidity"],
+    "Cybersecurity": ["cybersecurity", "cyber security", "security"],
+    "MERN": ["mern"],
+    "Full Stack": ["full stack", "fullstack", "full-stack"],
+    "Frontend": ["frontend", "front end", "front-end"],
+    "Backend": ["backend", "back end", "back-end"],
+    "App Development": ["app dev", "app development", "mobile dev", "mobile development"],
+    "Web Development": ["web dev", "web development", "webdev"],
+}
+
+INTERESTS = {
+    "Hackathons": ["hackathon", "hackathons"],
+    "Open Source": ["open source", "opensource", "gsoc"],
+    "Competitive Programming": ["competitive programming", "cp", "leetcode", "codeforces", "codechef"],
+    "Startups": ["startup", "startups"],
+    "Entrepreneurship": ["entrepreneurship", "entrepreneur"],
+    "Research": ["research", "paper", "papers"],
+    "Artificial Intelligence": ["ai", "artificial intelligence", "genai", "llm", "llms"],
+    "Game Development": ["game dev", "gamedev", "game development", "gaming"],
+    "Robotics": ["robotics", "iot"],
+    "Design": ["design", "designing"],
+    "Photography": ["photography"],
+    "Music": ["music"],
+    "Sports": ["sports", "cricket", "football"],
+}
+
+LOOKING_FOR = {
+    "Teammates": ["teammate", "teammates", "team", "partner", "partners"],
+    "Project Collaboration": ["project", "projects", "collab", "collaborate", "collaboration"],
+    "Study Group": ["study", "study partner", "study group"],
+    "Mentorship": ["mentor", "mentors", "mentorship", "guidance"],
+    "Internship": ["internship", "intern"],
+    "Co-founder": ["cofounder", "co-founder", "co founder"],
+}
+
+BRANCHES = {
+    "Computer Science and Engineering": ["cse", "cs", "computer science"],
+    "Information Technology": ["information technology"],
+    "Electronics and Communication Engineering": ["ece", "electronics", "electronics and communication"],
+    "Electrical Engineering": ["eee", "electrical"],
+    "Mechanical Engineering": ["mech", "mechanical"],
+    "Civil Engineering": ["civil"],
+    "Artificial Intelligence and Machine Learning": ["aiml", "ai ml", "ai&ml"],
+    "Artificial Intelligence and Data Science": ["aids", "ai&ds", "ai ds"],
+}
+
+# Short branch codes that collide with everyday words ("it", "me") only
+# count when written in upper case.
+CASE_SENSITIVE_BRANCHES = {
+    "IT": "Information Technology",
+    "ME": "Mechanical Engineering",
+    "CE": "Civil Engineering",
+    "EE": "Electrical Engineering",
+}
+
+# Skill aliases that are also everyday words ("my next hackathon", "spring
+# fest"). They only count next to a tech cue, e.g. "next js", "react node",
+# "swift developer"; on their own they stay unexplained, which pulls the
+# confidence down and leaves the query to the LLM.
+AMBIGUOUS_ALIASES = {"next", "spring", "express", "node", "rust", "swift", "dart", "cv"}
+TECH_CUES = {
+    "js", "dev", "devs", "developer", "developers", "framework", "stack", "backend", "frontend", "app", "apps",
+    "engineer", "engineers", "programming", "language", "coding", "coder",
+}
+
+# A match within this many tokens after a negation ("not into web3", "no
+# java") is an exclusion the schema cannot express, so it is not applied.
+NEGATIONS = {"not", "no", "without", "except", "never", "nahi", "nahin", "dont"}
+_NEGATION_WINDOW = 3
+
+SAME_BRANCH_PHRASES = ["apni branch", "meri branch", "same branch", "my branch", "apni class", "meri class", "my class"]
+SAME_CAMPUS_PHRASES = ["apna college", "mera college", "same college", "my college", "apne campus", "same campus", "my campus"]
+ONLINE_WORDS = {"online", "active"}
+
+# Words that carry no filter information; they neither raise nor lower confidence.
+FILLER_WORDS = {
+    "a", "an", "the", "and", "or", "with", "in", "of", "for", "to", "at", "from", "on", "who", "that", "is", "are",
+    "me", "my", "i", "we", "our", "us", "someone", "somebody", "anyone", "people", "person", "students", "student",
+    "find", "search", "show", "get", "need", "want", "looking", "look", "seeking", "good", "great", "strong", "best",
+    "knows", "know", "knowing", "experienced", "experience", "skilled", "expert", "devs", "dev", "developer",
+    "developers", "engineer", "engineers", "guys", "folks", "batch", "branch", "college", "campus", "class", "same",
+    "year", "now", "also", "please", "can", "could", "some", "any", "like", "interested", "into", "skills", "skill",
+    "chahiye", "koi", "jo", "wala", "wale", "wali", "ho", "hai", "hain", "mujhe", "dhundo", "ka", "ki", "ke", "se",
+    "mein", "aur", "apni", "apna", "apne", "meri", "mera", "mere", "bhi", "karo", "do", "de", "log", "logon",
+    "banda", "bande", "jaanta", "jaanti", "jaante", "aata", "aati", "aate",
+}
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#./&-]*|[+#]")
+_BATCH_PATTERN = re.compile(r"\b(20[0-9]{2})\b")
+_FUZZY_CUTOFF = 0.85
+_FUZZY_WEIGHT = 0.7
+
+_stats = {"resolved_locally": 0, "deferred_to_llm": 0}
+
+
+def _build_index(vocabulary: Dict[str, List[str]]) -> Dict[str, str]:
+    return {alias: canonical for canonical, aliases in vocabulary.items() for alias in aliases}
+
+
+_INDEXES = {
+    "skills_any": _build_index(SKILLS),
+    "interests_any": _build_index(INTERESTS),
+    "looking_for_any": _build_index(LOOKING_FOR),
+    "branch": _build_index(BRANCHES),
+}
+_MAX_NGRAM = max(len(alias.split()) for index in _INDEXES.values() for alias in index)
+_FUZZY_CANDIDATES = {
+    field: [alias for alias in index if " " not in alias and len(alias) >= 4 and alias not in AMBIGUOUS_ALIASES]
+    for field, index in _INDEXES.items()
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.strip(".-") or token for token in _TOKEN_PATTERN.findall((text or "").lower())]
+
+
+def empty_filters() -> Dict[str, Any]:
+    return {
+        "strict_filters": {"campus": "", "branch": "", "batch": ""},
+        "scoring_filters": {"skills_any": [], "interests_any": [], "looking_for_any": []},
+        "status_any": "any",
+    }
+
+
+def has_any_filter(filters: Dict[str, Any]) -> bool:
+    strict = filters.get("strict_filters") or {}
+    scoring = filters.get("scoring_filters") or {}
+    return (
+        any(str(value).strip() for value in strict.values())
+        or any(scoring.values())
+        or filters.get("status_any", "any") != "any"
+    )
+
+
+def _has_tech_cue(tokens: List[str], position: int) -> bool:
+    skills = _INDEXES["skills_any"]
+    for neighbour in tokens[max(0, position - 1):position] + tokens[position + 1:position + 2]:
+        if neighbour in TECH_CUES or (neighbour in skills and neighbour not in AMBIGUOUS_ALIASES):
+            return True
+    return False
+
+
+def _add(values: List[str], value: str):
+    if value not in values:
+        values.append(value)
+
+
+def extract_filters_locally(user_input: str, user_profile: dict = None) -> Tuple[Dict[str, Any], float]:
+    """
+    Fill the matchmaker filter schema from the vocabulary index. Returns the
+    filters and a 0-1 confidence: the share of informative query tokens the
+    index could explain, with fuzzy matches counting less than exact ones.
+    """
+    profile = user_profile or {}
+    filters = empty_filters()
+    strict = filters["strict_filters"]
+    scoring = filters["scoring_filters"]
+
+    query_lower = (user_input or "").lower()
+    tokens = tokenize(user_input)
+    explained = [0.0] * len(tokens)
+    negated = [
+        any(token in NEGATIONS for token in tokens[max(0, i - _NEGATION_WINDOW):i]) for i in range(len(tokens))
+    ]
+
+    if any(phrase in query_lower for phrase in SAME_BRANCH_PHRASES):
+        strict["branch"] = profile.get("branch", "Computer Science and Engineering")
+    if any(phrase in query_lower for phrase in SAME_CAMPUS_PHRASES):
+        strict["campus"] = profile.get("campus", "UIT")
+
+    batch = _BATCH_PATTERN.search(query_lower)
+    if batch:
+        strict["batch"] = batch.group(1)
+
+    for word in re.findall(r"\b[A-Z]{2}\b", user_input or ""):
+        if word in CASE_SENSITIVE_BRANCHES and not strict["branch"]:
+            strict["branch"] = CASE_SENSITIVE_BRANCHES[word]
+            for i, token in enumerate(tokens):
+                if token == word.lower():
+                    explained[i] = 1.0
+
+    position = 0
+    while position < len(tokens):
+        matched = False
+        if negated[position]:
+            position += 1
+            continue
+        for size in range(min(_MAX_NGRAM, len(tokens) - position), 0, -1):
+            phrase = " ".join(tokens[position:position + size])
+            if size == 1 and phrase in AMBIGUOUS_ALIASES and not _has_tech_cue(tokens, position):
+                continue
+            for field, index in _INDEXES.items():
+                canonical = index.get(phrase)
+                if canonical is None:
+                    continue
+                if field == "branch":
+                    if not strict["branch"]:
+                        strict["branch"] = canonical
+                else:
+                    _add(scoring[field], canonical)
+                for offset in range(size):
+                    explained[position + offset] = 1.0
+                matched = True
+            if matched:
+                position += size
+                break
+        if not matched:
+            position += 1
+
+    for i, token in enumerate(tokens):
+        if explained[i] or negated[i] or token in FILLER_WORDS or _BATCH_PATTERN.fullmatch(token):
+            continue
+        if token in ONLINE_WORDS:
+            filters["status_any"] = "online"
+            explained[i] = 1.0
+            continue
+        for field, candidates in _FUZZY_CANDIDATES.items():
+            if len(token) < 4:
+                break
+            close = difflib.get_close_matches(token, candidates, n=1, cutoff=_FUZZY_CUTOFF)
+            if close:
+                canonical = _INDEXES[field][close[0]]
+                if field == "branch":
+                    strict["branch"] = strict["branch"] or canonical
+                else:
+                    _add(scoring[field], canonical)
+                explained[i] = _FUZZY_WEIGHT
+                break
+
+    informative = [
+        weight for token, weight in zip(tokens, explained)
+        if weight or not (token in FILLER_WORDS or _BATCH_PATTERN.fullmatch(token))
+    ]
+    if not has_any_filter(filters):
+        confidence = 0.0
+    elif not informative:
+        confidence = 1.0
+    else:
+        confidence = sum(informative) / len(informative)
+
+    return filters, round(confidence, 3)
+
+
+def record_resolution(resolved_locally: bool):
+    _stats["resolved_locally" if resolved_locally else "deferred_to_llm"] += 1
+
+
+def local_extractor_stats() -> Dict[str, Any]:
+    return {"confidence_threshold": LOCAL_CONFIDENCE_THRESHOLD, **_stats}
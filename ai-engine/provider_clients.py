@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+env_path = Path(__file__).parent / ".env"
+load_dotenv(dotenv_path=env_path)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+CHAT_MODEL = os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile")
+GROQ_TIMEOUT_SEC = _env_float("GROQ_TIMEOUT_SEC", 30.0)
+GROQ_CONNECT_TIMEOUT_SEC = _env_float("GROQ_CONNECT_TIMEOUT_SEC", 5.0)
+# Retries happen in provider_gateway, which can also fail over and respects
+# the route budget; SDK-level retries would multiply with those.
+GROQ_MAX_RETRIES = _env_int("GROQ_MAX_RETRIES", 0)
+GEMINI_TIMEOUT_SEC = _env_float("GEMINI_TIMEOUT_SEC", 60.0)
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "").strip() or None
+HTTP_MAX_CONNECTIONS = _env_int("PROVIDER_HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = _env_int("PROVIDER_HTTP_MAX_KEEPALIVE", 20)
+HTTP_FETCH_TIMEOUT_SEC = _env_float("HTTP_FETCH_TIMEOUT_SEC", 10.0)
+GEMINI_FAILOVER_MODEL = os.getenv("GATEWAY_GEMINI_FAILOVER_MODEL", "gemini-2.5-flash")
+
+_lock = threading.Lock()
+_groq_client = None
+_raw_groq_client = None
+_async_http_client = None
+_gemini_configured = False
+_gemini_models: Dict[str, Any] = {}
+_raw_gemini_models: Dict[str, Any] = {}
+
+
+def get_groq_client():
+    """
+    Shared Groq client over one keep-alive connection pool, wrapped by
+    provider_gateway for retries, circuit breaking and Gemini failover.
+    """
+    global _groq_client
+    if _groq_client is None:
+        from provider_gateway import ResilientGroqClient
+
+        client = _get_raw_groq_client()
+        with _lock:
+            if _groq_client is None:
+                _groq_client = ResilientGroqClient(
+                    client, _get_raw_gemini_model, GEMINI_FAILOVER_MODEL, default_timeout=GROQ_TIMEOUT_SEC
+                )
+    return _groq_client
+
+
+def _get_raw_groq_client():
+    global _raw_groq_client
+    if _raw_groq_client is None:
+        with _lock:
+            if _raw_groq_client is None:
+                import httpx
+                from groq import Groq
+
+                timeout = httpx.Timeout(GROQ_TIMEOUT_SEC, connect=GROQ_CONNECT_TIMEOUT_SEC)
+                http_client = httpx.Client(
+                    timeout=timeout,
+                    limits=httpx.Limits(
+                        max_connections=HTTP_MAX_CONNECTIONS,
+                        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                    ),
+                )
+                _raw_groq_client = Groq(
+                    api_key=os.getenv("GROQ_API_KEY"),
+                    timeout=timeout,
+                    max_retries=GROQ_MAX_RETRIES,
+                    http_client=http_client,
+                )
+    return _raw_groq_client
+
+
+def get_async_http_client():
+    """Shared async HTTP client for fetching user content such as image URLs."""
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+
+        _async_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_FETCH_TIMEOUT_SEC, connect=GROQ_CONNECT_TIMEOUT_SEC),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+    return _async_http_client
+
+
+async def close_async_http_client():
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
+def _ensure_gemini_configured():
+    global _gemini_configured
+    if _gemini_configured:
+        return
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY not found in .env file")
+    import google.generativeai as genai
+
+    genai.configure(api_key=api_key, transport=GEMINI_TRANSPORT)
+    _gemini_configured = True
+
+
+def get_gemini_model(model_name: str, generation_config: Optional[Dict[str, Any]] = None):
+    """
+    Reusable GenerativeModel handle. Handles are cached per model name and
+    generation config, and all of them share the configured SDK client.
+    Calls go through provider_gateway; text-only prompts can fail over to Groq.
+    """
+    if not model_name.startswith("models/"):
+        model_name = f"models/{model_name}"
+    key = model_name + json.dumps(generation_config or {}, sort_keys=True)
+    model = _gemini_models.get(key)
+    if model is None:
+        from provider_gateway import ResilientGeminiModel
+
+        raw_model = _get_raw_gemini_model(model_name, generation_config)
+        with _lock:
+            model = _gemini_models.get(key)
+            if model is None:
+                model = ResilientGeminiModel(
+                    raw_model, model_name[len("models/"):], generation_config, _get_raw_groq_client, CHAT_MODEL
+                )
+                _gemini_models[key] = model
+    return model
+
+
+def _get_raw_gemini_model(model_name: str, generation_config: Optional[Dict[str, Any]] = None):
+    if not model_name.startswith("models/"):
+        model_name = f"models/{model_name}"
+    key = model_name + json.dumps(generation_config or {}, sort_keys=True)
+    model = _raw_gemini_models.get(key)
+    if model is None:
+        with _lock:
+            _ensure_gemini_configured()
+            model = _raw_gemini_models.get(key)
+            if model is None:
+                import google.generativeai as genai
+
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                _raw_gemini_models[key] = model
+    return model
+
+
+def gemini_request_options() -> Dict[str, Any]:
+    return {"timeout": GEMINI_TIMEOUT_SEC}
@@ -0,0 +1,527 @@
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import metrics
+import rate_limiter
+import tracing
+from rate_limiter import ProviderBusy
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(0, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() in {"1", "true", "yes"}
+
+
+GATEWAY_MAX_RETRIES = _env_int("GATEWAY_MAX_RETRIES", 2)
+GATEWAY_RETRY_BASE_SEC = _env_float("GATEWAY_RETRY_BASE_SEC", 0.25)
+GATEWAY_RETRY_MAX_SEC = _env_float("GATEWAY_RETRY_MAX_SEC", 4.0)
+GATEWAY_HEDGING = _env_flag("GATEWAY_HEDGING", "false")
+GATEWAY_HEDGE_MIN_SAMPLES = _env_int("GATEWAY_HEDGE_MIN_SAMPLES", 20)
+GATEWAY_BREAKER_FAILURES = max(1, _env_int("GATEWAY_BREAKER_FAILURES", 5))
+GATEWAY_BREAKER_COOLDOWN_SEC = _env_float("GATEWAY_BREAKER_COOLDOWN_SEC", 30.0)
+GATEWAY_FAILOVER = _env_flag("GATEWAY_FAILOVER", "true")
+GATEWAY_DEFAULT_BUDGET_SEC = _env_float("GATEWAY_DEFAULT_BUDGET_SEC", 60.0)
+
+# Total time a request may spend on provider calls, including retries,
+# hedges and failover. Matched by longest path prefix; override with
+# GATEWAY_ROUTE_BUDGETS="/chat=10,/interviewer=15".
+ROUTE_BUDGETS: Dict[str, float] = {
+    "/chat": 15.0,
+    "/matchmaker": 10.0,
+    "/interviewer": 20.0,
+    "/generateIP": 45.0,
+    "/generate": 45.0,
+    "/resumeanalyzer": 60.0,
+    "/generate_assessment": 60.0,
+    "/assess_response": 60.0,
+    "/analyze": 120.0,
+}
+for _item in os.getenv("GATEWAY_ROUTE_BUDGETS", "").split(","):
+    _path, _, _seconds = _item.partition("=")
+    try:
+        ROUTE_BUDGETS[_path.strip()] = float(_seconds)
+    except ValueError:
+        pass
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("provider_deadline", default=None)
+
+
+def route_budget(path: str) -> float:
+    matches = [prefix for prefix in ROUTE_BUDGETS if prefix and path.startswith(prefix)]
+    return ROUTE_BUDGETS[max(matches, key=len)] if matches else GATEWAY_DEFAULT_BUDGET_SEC
+
+
+def start_route_budget(path: str) -> contextvars.Token:
+    """Start the provider time budget for the current request."""
+    return _deadline.set(time.monotonic() + route_budget(path))
+
+
+def reset_route_budget(token: contextvars.Token):
+    _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+class GatewayTimeout(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and (status in {408, 409, 429} or status >= 500):
+        return True
+    name = type(error).__name__
+    return any(
+        marker in name
+        for marker in ("Timeout", "Connection", "RateLimit", "ServiceUnavailable", "DeadlineExceeded",
+                       "ResourceExhausted", "InternalServer", "TooManyRequests")
+    )
+
+
+class CircuitBreaker:
+    """
+    Opens after GATEWAY_BREAKER_FAILURES consecutive retryable failures and
+    rejects calls for GATEWAY_BREAKER_COOLDOWN_SEC. Then one trial call is
+    let through (half-open); its outcome closes or re-opens the circuit. A
+    trial that ends without an outcome, or runs longer than the cooldown,
+    re-opens it too, so the circuit can never stay half-open.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown_sec: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_sec = cooldown_sec
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_started_at = 0.0
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    def admit(self) -> Optional[str]:
+        """"call" or "trial" when a call may go ahead, None when the circuit rejects it."""
+        with self._lock:
+            if self.state == "closed":
+                return "call"
+            now = time.monotonic()
+            if (
+                (self.state == "open" and now - self.opened_at >= self.cooldown_sec)
+                or (self.state == "half_open" and now - self.trial_started_at >= self.cooldown_sec)
+            ):
+                self.state = "half_open"
+                self.trial_started_at = now
+                return "trial"
+            return None
+
+    def end_trial(self):
+        """Re-open the circuit if the trial call finished without recording an outcome."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class _Endpoint:
+    """Breaker, latency window and counters for one provider/model."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.breaker = CircuitBreaker(GATEWAY_BREAKER_FAILURES, GATEWAY_BREAKER_COOLDOWN_SEC)
+        self.latencies = deque(maxlen=200)
+        self.counters = {
+            "calls": 0, "failures": 0, "retries": 0, "rejected": 0,
+            "hedges": 0, "hedge_wins": 0, "failovers": 0, "budget_exhausted": 0, "shed": 0,
+        }
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < max(1, GATEWAY_HEDGE_MIN_SAMPLES):
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            **self.counters,
+            "circuit": self.breaker.state,
+            "circuit_trips": self.breaker.trips,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+PROVIDER_LATENCY = metrics.histogram(
+    "ai_engine_provider_call_duration_seconds",
+    "Latency of one provider call attempt",
+    ("provider", "model", "outcome"),
+)
+PROVIDER_TOKENS = metrics.counter(
+    "ai_engine_provider_tokens_total",
+    "Tokens reported by provider responses",
+    ("provider", "model", "kind"),
+)
+
+_endpoints: Dict[str, _Endpoint] = {}
+_endpoints_lock = threading.Lock()
+_hedge_executor = ThreadPoolExecutor(max_workers=_env_int("GATEWAY_HEDGE_THREADS", 16) or 1, thread_name_prefix="hedge")
+
+
+def _endpoint(provider: str, model: str) -> _Endpoint:
+    key = f"{provider}/{model}"
+    endpoint = _endpoints.get(key)
+    if endpoint is None:
+        with _endpoints_lock:
+            endpoint = _endpoints.setdefault(key, _Endpoint(key))
+    return endpoint
+
+
+def _hedged(endpoint: _Endpoint, call: Callable[[Optional[float]], Any], timeout: Optional[float]) -> Any:
+    """
+    Run call and, if it has not answered within the endpoint's p95 latency,
+    fire a second identical request and take whichever succeeds first.
+    """
+    delay = endpoint.p95()
+    if not GATEWAY_HEDGING or delay is None or (timeout is not None and delay >= timeout):
+        return call(timeout)
+
+    first = _hedge_executor.submit(contextvars.copy_context().run, call, timeout)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    endpoint.counters["hedges"] += 1
+    remaining = None if timeout is None else max(0.01, timeout - delay)
+    second = _hedge_executor.submit(contextvars.copy_context().run, call, remaining)
+    pending = {first, second}
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            raise GatewayTimeout(f"{endpoint.key} did not answer within the request budget")
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    endpoint.counters["hedge_wins"] += 1
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def execute(
+    provider: str,
+    model: str,
+    call: Callable[[Optional[float]], Any],
+    failover: Optional[Callable[[], Any]] = None,
+    streaming: bool = False,
+    cost: int = 0,
+) -> Any:
+    """
+    Run call(timeout) against provider/model inside the request budget:
+    circuit breaker check, rate-limit admission for about cost tokens,
+    jittered exponential retries on retryable errors, optional hedging,
+    then failover() once the provider is out of options. Streaming calls
+    only get the breaker, admission and the timeout.
+    """
+    with tracing.span("provider.call", provider=provider, model=model, streaming=streaming) as call_span:
+        return _execute(call_span, provider, model, call, failover, streaming, cost)
+
+
+def _execute(call_span, provider, model, call, failover, streaming, cost):
+    endpoint = _endpoint(provider, model)
+    use_failover = failover is not None and GATEWAY_FAILOVER
+    admitted = endpoint.breaker.admit()
+    if admitted is None:
+        endpoint.counters["rejected"] += 1
+        call_span.set(outcome="circuit_open")
+        if use_failover:
+            endpoint.counters["failovers"] += 1
+            call_span.set(failover=True)
+            return failover()
+        raise CircuitOpenError(f"{endpoint.key} circuit is open")
+    try:
+        return _attempt(call_span, endpoint, provider, model, call, failover, use_failover, streaming, cost)
+    finally:
+        # Shed, out of budget or a non-retryable error: the trial proved
+        # nothing, so wait out another cooldown rather than stay half-open.
+        if admitted == "trial":
+            endpoint.breaker.end_trial()
+
+
+def _attempt(call_span, endpoint, provider, model, call, failover, use_failover, streaming, cost):
+    retries = 0 if streaming else GATEWAY_MAX_RETRIES
+    error: Optional[BaseException] = None
+    for attempt in range(retries + 1):
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            endpoint.counters["budget_exhausted"] += 1
+            error = error or GatewayTimeout(f"{endpoint.key} request budget exhausted")
+            break
+
+        try:
+            queued = rate_limiter.acquire(provider, model, cost, remaining)
+        except ProviderBusy:
+            endpoint.counters["shed"] += 1
+            call_span.set(outcome="shed")
+            if use_failover:
+                endpoint.counters["failovers"] += 1
+                call_span.set(failover=True)
+                return failover()
+            raise
+        remaining = remaining_budget()
+        call_span.set(attempts=attempt + 1, queued_ms=round(queued * 1000, 2))
+
+        endpoint.counters["calls"] += 1
+        started_at = time.perf_counter()
+        try:
+            result = call(remaining) if streaming else _hedged(endpoint, call, remaining)
+        except Exception as e:
+            error = e
+            endpoint.counters["failures"] += 1
+            PROVIDER_LATENCY.observe(time.perf_counter() - started_at, provider, model, "error")
+            if not is_retryable(e):
+                raise
+            endpoint.breaker.record_failure()
+            if attempt < retries and endpoint.breaker.state != "open":
+                endpoint.counters["retries"] += 1
+                backoff = random.uniform(0, min(GATEWAY_RETRY_MAX_SEC, GATEWAY_RETRY_BASE_SEC * (2 ** attempt)))
+                remaining = remaining_budget()
+                time.sleep(backoff if remaining is None else max(0.0, min(backoff, remaining)))
+                continue
+            break
+        elapsed = time.perf_counter() - started_at
+        endpoint.latencies.append(elapsed)
+        endpoint.breaker.record_success()
+        PROVIDER_LATENCY.observe(elapsed, provider, model, "ok")
+        prompt_tokens, completion_tokens = _usage(result)
+        if prompt_tokens is not None:
+            PROVIDER_TOKENS.inc(provider, model, "prompt", amount=prompt_tokens)
+        if completion_tokens is not None:
+            PROVIDER_TOKENS.inc(provider, model, "completion", amount=completion_tokens)
+        if prompt_tokens is not None or completion_tokens is not None:
+            rate_limiter.settle(provider, model, cost, (prompt_tokens or 0) + (completion_tokens or 0))
+            call_span.set(prompt_tokens=prompt_tokens or 0, completion_tokens=completion_tokens or 0)
+        call_span.set(outcome="ok")
+        return result
+
+    call_span.set(outcome="error", error_type=type(error).__name__)
+    if use_failover:
+        endpoint.counters["failovers"] += 1
+        call_span.set(failover=True)
+        logger.warning("Failing over from %s: %s", endpoint.key, error)
+        return failover()
+    raise error
+
+
+def _usage(result: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, completion) token counts from a Groq or Gemini response, when reported."""
+    def count(source, name):
+        value = getattr(source, name, None)
+        return value if isinstance(value, int) else None
+
+    usage = getattr(result, "usage", None)
+    if usage is not None:
+        return count(usage, "prompt_tokens"), count(usage, "completion_tokens")
+    metadata = getattr(result, "usage_metadata", None)
+    if metadata is not None:
+        return count(metadata, "prompt_token_count"), count(metadata, "candidates_token_count")
+    return None, None
+
+
+def _chat_cost(request: Dict[str, Any]) -> int:
+    prompt = sum(rate_limiter.estimate_tokens(str(m.get("content") or "")) for m in request.get("messages", []))
+    return prompt + (request.get("max_tokens") or rate_limiter.DEFAULT_OUTPUT_TOKENS)
+
+
+def _content_tokens(contents: Any) -> int:
+    if isinstance(contents, str):
+        return rate_limiter.estimate_tokens(contents)
+    if isinstance(contents, dict):
+        if "parts" in contents:
+            return _content_tokens(contents["parts"])
+        if "text" in contents:
+            return rate_limiter.estimate_tokens(str(contents["text"]))
+        return rate_limiter.IMAGE_TOKENS
+    if isinstance(contents, (list, tuple)):
+        return sum(_content_tokens(part) for part in contents)
+    return rate_limiter.IMAGE_TOKENS
+
+
+def _generate_cost(contents: Any, generation_config: Dict[str, Any]) -> int:
+    output = generation_config.get("max_output_tokens") or rate_limiter.DEFAULT_OUTPUT_TOKENS
+    return _content_tokens(contents) + output
+
+
+def _chat_via_gemini(model_factory: Callable, model_name: str, request: Dict[str, Any], timeout: Optional[float]):
+    """Answer a Groq chat.completions request with Gemini, shaped like a Groq response."""
+    system_text = "\n\n".join(m["content"] for m in request.get("messages", []) if m.get("role") == "system")
+    contents = []
+    if system_text:
+        contents.append({"role": "user", "parts": [f"Instructions:\n{system_text}"]})
+    for message in request.get("messages", []):
+        if message.get("role") != "system":
+            role = "model" if message.get("role") == "assistant" else "user"
+            contents.append({"role": role, "parts": [str(message.get("content") or "")]})
+
+    generation_config: Dict[str, Any] = {}
+    if request.get("temperature") is not None:
+        generation_config["temperature"] = request["temperature"]
+    if request.get("max_tokens"):
+        generation_config["max_output_tokens"] = request["max_tokens"]
+    if (request.get("response_format") or {}).get("type") == "json_object":
+        generation_config["response_mime_type"] = "application/json"
+
+    response = model_factory(model_name).generate_content(
+        contents,
+        generation_config=generation_config,
+        request_options={"timeout": timeout} if timeout else None,
+    )
+    message = SimpleNamespace(role="assistant", content=response.text)
+    return SimpleNamespace(model=model_name, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
+
+
+def _text_via_groq(client_factory: Callable, model_name: str, contents: Any, generation_config: Dict[str, Any],
+                   timeout: Optional[float]):
+    """Answer a text-only Gemini generate_content request with Groq, shaped like a Gemini response."""
+    prompt = contents if isinstance(contents, str) else "\n\n".join(contents)
+    request: Dict[str, Any] = {"model": model_name, "messages": [{"role": "user", "content": prompt}]}
+    if generation_config.get("temperature") is not None:
+        request["temperature"] = generation_config["temperature"]
+    if generation_config.get("max_output_tokens"):
+        request["max_tokens"] = generation_config["max_output_tokens"]
+    if generation_config.get("response_mime_type") == "application/json":
+        request["response_format"] = {"type": "json_object"}
+    if timeout:
+        request["timeout"] = timeout
+    completion = client_factory().chat.completions.create(**request)
+    return SimpleNamespace(text=completion.choices[0].message.content or "")
+
+
+def _is_text_only(contents: Any) -> bool:
+    return isinstance(contents, str) or (isinstance(contents, list) and all(isinstance(part, str) for part in contents))
+
+
+class ResilientGroqClient:
+    """Groq client whose chat completions go through execute(), failing over to Gemini."""
+
+    def __init__(self, client, gemini_model_factory: Callable, failover_model: str, default_timeout: float):
+        self._client = client
+        self._default_timeout = default_timeout
+        self._gemini_model_factory = gemini_model_factory
+        self._failover_model = failover_model
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def _create(self, **request):
+        streaming = bool(request.get("stream"))
+
+        def call(timeout):
+            if timeout:
+                request["timeout"] = min(timeout, self._default_timeout)
+            return self._client.chat.completions.create(**request)
+
+        cost = _chat_cost(request)
+
+        def failover():
+            return execute(
+                "gemini", self._failover_model,
+                lambda timeout: _chat_via_gemini(self._gemini_model_factory, self._failover_model, request, timeout),
+                cost=cost,
+            )
+
+        return execute(
+            "groq", request.get("model", ""), call, None if streaming else failover, streaming=streaming, cost=cost
+        )
+
+
+class ResilientGeminiModel:
+    """GenerativeModel whose generate_content goes through execute(); text-only prompts fail over to Groq."""
+
+    def __init__(self, model, model_name: str, generation_config: Optional[Dict[str, Any]],
+                 groq_client_factory: Callable, failover_model: str):
+        self._model = model
+        self._model_name = model_name
+        self._generation_config = generation_config or {}
+        self._groq_client_factory = groq_client_factory
+        self._failover_model = failover_model
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def generate_content(self, contents, **kwargs):
+        streaming = bool(kwargs.get("stream"))
+
+        def call(timeout):
+            options = dict(kwargs.get("request_options") or {})
+            if timeout:
+                options["timeout"] = min(options.get("timeout", timeout), timeout)
+            return self._model.generate_content(contents, **{**kwargs, "request_options": options or None})
+
+        config = {**self._generation_config, **(kwargs.get("generation_config") or {})}
+        cost = _generate_cost(contents, config)
+
+        def failover():
+            return execute(
+                "groq", self._failover_model,
+                lambda timeout: _text_via_groq(self._groq_client_factory, self._failover_model, contents, config, timeout),
+                cost=cost,
+            )
+
+        can_fail_over = not streaming and _is_text_only(contents)
+        return execute(
+            "gemini", self._model_name, call, failover if can_fail_over else None, streaming=streaming, cost=cost
+        )
+
+
+def provider_gateway_stats() -> Dict[str, Any]:
+    return {
+        "hedging": GATEWAY_HEDGING,
+        "failover": GATEWAY_FAILOVER,
+        "max_retries": GATEWAY_MAX_RETRIES,
+        "endpoints": {key: endpoint.snapshot() for key, endpoint in sorted(_endpoints.items())},
+    }
@@ -0,0 +1,212 @@
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+import metrics
+import tracing
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+WORKER_THREADS = _env_int("PROVIDER_WORKER_THREADS", 64)
+PROVIDER_LIMITS = {
+    "groq": _env_int("GROQ_MAX_CONCURRENCY", 32),
+    "gemini": _env_int("GEMINI_MAX_CONCURRENCY", 32),
+}
+DEFAULT_PROVIDER_LIMIT = _env_int("PROVIDER_MAX_CONCURRENCY", 16)
+
+_executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="provider")
+
+
+class _ProviderSlot:
+    """Concurrency limit plus queue-depth bookkeeping for one provider."""
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.semaphore = asyncio.Semaphore(limit)
+        self.waiting = 0
+        self.in_flight = 0
+        self.max_waiting = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_sec = 0.0
+        self.total_run_sec = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "limit": self.limit,
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "max_waiting": self.max_waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": round(self.total_wait_sec * 1000 / finished, 2) if finished else 0.0,
+            "avg_run_ms": round(self.total_run_sec * 1000 / finished, 2) if finished else 0.0,
+        }
+
+
+_slots: Dict[str, _ProviderSlot] = {}
+_slots_lock = threading.Lock()
+
+
+def _slot(provider: str) -> _ProviderSlot:
+    slot = _slots.get(provider)
+    if slot is None:
+        with _slots_lock:
+            slot = _slots.get(provider)
+            if slot is None:
+                slot = _ProviderSlot(provider, PROVIDER_LIMITS.get(provider, DEFAULT_PROVIDER_LIMIT))
+                _slots[provider] = slot
+    return slot
+
+
+async def _enter(slot: _ProviderSlot) -> float:
+    queued_at = time.perf_counter()
+    slot.waiting += 1
+    slot.max_waiting = max(slot.max_waiting, slot.waiting)
+    try:
+        await slot.semaphore.acquire()
+    finally:
+        slot.waiting -= 1
+
+    started_at = time.perf_counter()
+    slot.total_wait_sec += started_at - queued_at
+    slot.in_flight += 1
+    return started_at
+
+
+def _leave(slot: _ProviderSlot, started_at: float, failed: bool):
+    slot.in_flight -= 1
+    slot.total_run_sec += time.perf_counter() - started_at
+    if failed:
+        slot.failed += 1
+    else:
+        slot.completed += 1
+    slot.semaphore.release()
+
+
+def _leave_when_done(loop: asyncio.AbstractEventLoop, slot: _ProviderSlot, started_at: float, future: Future):
+    """
+    Give the slot back once the worker thread has finished with future, not
+    when its awaiter gives up, so a cancelled caller cannot push the provider
+    past its concurrency limit.
+    """
+    def done(_):
+        failed = future.cancelled() or future.exception() is not None
+        with contextlib.suppress(RuntimeError):  # loop already closed at shutdown
+            loop.call_soon_threadsafe(_leave, slot, started_at, failed)
+
+    future.add_done_callback(done)
+
+
+async def run_provider_call(provider: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking provider SDK call on the shared worker pool without
+    holding the event loop. At most PROVIDER_LIMITS[provider] calls run at
+    once; the rest wait on the provider's semaphore and count as queued.
+    """
+    slot = _slot(provider)
+    queued_at = time.perf_counter()
+    with tracing.span("provider_pool.run", provider=provider, function=getattr(func, "__name__", "call")) as pool_span:
+        started_at = await _enter(slot)
+        pool_span.set(pool_wait_ms=round((started_at - queued_at) * 1000, 2))
+        try:
+            future = _executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+        except BaseException:
+            _leave(slot, started_at, True)
+            raise
+        _leave_when_done(asyncio.get_running_loop(), slot, started_at, future)
+        return await asyncio.wrap_future(future)
+
+
+async def iterate_provider_stream(
+    provider: str, factory: Callable[..., Iterator[Any]], *args, **kwargs
+) -> AsyncIterator[Any]:
+    """
+    Async view over a blocking streaming call. The provider slot is held for
+    the whole stream and every next() runs on the worker pool.
+    """
+    slot = _slot(provider)
+    started_at = await _enter(slot)
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    done = object()
+    opened: Optional[Future] = None
+    pending: Optional[Future] = None
+    failed = True
+
+    def leave():
+        with contextlib.suppress(RuntimeError):  # loop already closed at shutdown
+            loop.call_soon_threadsafe(_leave, slot, started_at, failed)
+
+    def close_stream():
+        # Runs only after the last next() has returned, so the copied context
+        # is free to be entered again. The slot is released even if close fails.
+        try:
+            if opened is not None and not opened.cancelled() and opened.exception() is None:
+                close = getattr(opened.result(), "close", None)
+                if close is not None:
+                    context.run(close)
+        finally:
+            leave()
+
+    def schedule_close(_):
+        try:
+            _executor.submit(close_stream)
+        except RuntimeError:  # pool shut down
+            leave()
+
+    try:
+        opened = pending = _executor.submit(functools.partial(context.run, factory, *args, **kwargs))
+        iterator = await asyncio.wrap_future(pending)
+        while True:
+            pending = _executor.submit(context.run, next, iterator, done)
+            item = await asyncio.wrap_future(pending)
+            if item is done:
+                break
+            yield item
+        failed = False
+    finally:
+        # A consumer that disconnects mid-next() lands here while a worker is
+        # still inside context, so closing and the slot release wait for it.
+        if pending is None:
+            _leave(slot, started_at, True)
+        else:
+            pending.add_done_callback(schedule_close)
+
+
+def provider_pool_stats() -> Dict[str, Any]:
+    return {
+        "worker_threads": WORKER_THREADS,
+        "providers": {name: slot.snapshot() for name, slot in sorted(_slots.items())},
+    }
+
+
+def _collect_provider_pool_metrics():
+    slots = sorted(_slots.items())
+    yield ("ai_engine_provider_pool_in_flight", "gauge", "Provider calls running on the worker pool",
+           [({"provider": name}, slot.in_flight) for name, slot in slots])
+    yield ("ai_engine_provider_pool_waiting", "gauge", "Provider calls waiting for a concurrency slot",
+           [({"provider": name}, slot.waiting) for name, slot in slots])
+    yield ("ai_engine_provider_pool_wait_seconds_total", "counter", "Time spent waiting for a concurrency slot",
+           [({"provider": name}, slot.total_wait_sec) for name, slot in slots])
+
+
+metrics.register_collector(_collect_provider_pool_metrics)
+
+
+def shutdown_provider_pool():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,334 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from provider_clients import gemini_request_options, get_gemini_model
+from provider_pool import run_provider_call
+
+logger = logging.getLogger(__name__)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+QUESTION_BANK_PATH = os.getenv("QUESTION_BANK_PATH") or str(Path(__file__).parent / ".cache" / "question_bank.sqlite3")
+QUESTION_BANK_MIN_PER_BUCKET = _env_int("QUESTION_BANK_MIN_PER_BUCKET", 30)
+QUESTION_BANK_TOP_UP_BATCH = _env_int("QUESTION_BANK_TOP_UP_BATCH", 10)
+DIFFICULTIES = {"basic", "moderate", "tough"}
+
+_NOISE = re.compile(r"[^a-z0-9+#]+")
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(_NOISE.sub(" ", (text or "").lower()).split())
+
+
+def question_fingerprint(question: str) -> str:
+    return hashlib.sha256(normalize_text(question).encode("utf-8")).hexdigest()
+
+
+def normalize_difficulty(difficulty: str) -> str:
+    value = (difficulty or "moderate").strip().lower()
+    return value if value in DIFFICULTIES else "moderate"
+
+
+def split_topics(topics: str) -> List[str]:
+    seen = []
+    for topic in (topics or "General").split(","):
+        topic = " ".join(topic.split())
+        if topic and topic.lower() not in {t.lower() for t in seen}:
+            seen.append(topic)
+    return seen or ["General"]
+
+
+class QuestionBank:
+    """
+    SQLite store of generated MCQs, indexed by (role, topic, difficulty)
+    bucket and unique on the normalized question text.
+    """
+
+    def __init__(self, path: str = QUESTION_BANK_PATH):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            "id INTEGER PRIMARY KEY, fingerprint TEXT NOT NULL UNIQUE, role TEXT NOT NULL, topic TEXT NOT NULL, "
+            "difficulty TEXT NOT NULL, question TEXT NOT NULL, options TEXT NOT NULL, answer TEXT, "
+            "explanation TEXT, served INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS questions_bucket ON questions (role, topic, difficulty, served)")
+
+    def add(self, role: str, topic: str, difficulty: str, questions: List[Dict[str, Any]]) -> int:
+        rows = []
+        for item in questions:
+            question = str(item.get("question") or "").strip()
+            options = item.get("options")
+            if not question or not isinstance(options, list) or len(options) < 2:
+                continue
+            options = [str(option).strip() for option in options]
+            answer = str(item.get("answer") or "").strip()
+            if answer not in options:
+                answer = None
+            rows.append((
+                question_fingerprint(question), normalize_text(role), normalize_text(topic),
+                difficulty, question, json.dumps(options, ensure_ascii=False), answer,
+                str(item.get("explanation") or "").strip() or None, time.time(),
+            ))
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO questions "
+                "(fingerprint, role, topic, difficulty, question, options, answer, explanation, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    def count(self, role: str, topic: str, difficulty: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM questions WHERE role = ? AND topic = ? AND difficulty = ?",
+                (normalize_text(role), normalize_text(topic), difficulty),
+            ).fetchone()[0]
+
+    def sample(self, role: str, topic: str, difficulty: str, limit: int, exclude: List[int]) -> List[Dict[str, Any]]:
+        """Least-served questions of a bucket first, shuffled within equal counts."""
+        excluded = f"AND id NOT IN ({','.join('?' * len(exclude))}) " if exclude else ""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, topic, question, options FROM questions "
+                f"WHERE role = ? AND topic = ? AND difficulty = ? {excluded}"
+                "ORDER BY served ASC, RANDOM() LIMIT ?",
+                (normalize_text(role), normalize_text(topic), difficulty, *exclude, limit),
+            ).fetchall()
+        return [{"bank_id": row[0], "topic": row[1], "question": row[2], "options": json.loads(row[3])} for row in rows]
+
+    def mark_served(self, ids: List[int]):
+        with self._lock:
+            self._conn.executemany("UPDATE questions SET served = served + 1 WHERE id = ?", [(i,) for i in ids])
+
+    def answer_keys(self, questions: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """Stored answer (and explanation) for each question text, None where unknown."""
+        fingerprints = [question_fingerprint(question) for question in questions]
+        if not fingerprints:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT fingerprint, answer, explanation FROM questions "
+                f"WHERE answer IS NOT NULL AND fingerprint IN ({','.join('?' * len(fingerprints))})",
+                fingerprints,
+            ).fetchall()
+        keys = {row[0]: {"answer": row[1], "explanation": row[2]} for row in rows}
+        return [keys.get(fingerprint) for fingerprint in fingerprints]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total, answered = self._conn.execute("SELECT COUNT(*), COUNT(answer) FROM questions").fetchone()
+            buckets = self._conn.execute("SELECT COUNT(*) FROM (SELECT 1 FROM questions GROUP BY role, topic, difficulty)").fetchone()[0]
+        return {"questions": total, "with_answer_key": answered, "buckets": buckets}
+
+
+_bank: Optional[QuestionBank] = None
+_bank_lock = threading.Lock()
+_topping_up: set = set()
+_background: set = set()
+_counters = {"assembled": 0, "fallback_generations": 0, "top_ups": 0, "top_up_failures": 0, "questions_added": 0}
+
+
+def get_question_bank() -> QuestionBank:
+    global _bank
+    if _bank is None:
+        with _bank_lock:
+            if _bank is None:
+                _bank = QuestionBank()
+    return _bank
+
+
+def _generate_bucket_questions(role: str, topic: str, difficulty: str, count: int) -> List[Dict[str, Any]]:
+    prompt = f"""
+    You are an expert technical interviewer building a question bank for the {role} role.
+
+    REQUIREMENTS:
+    - Write {count} distinct multiple-choice questions (MCQs) on: {topic}
+    - Difficulty level: {difficulty}
+    - Each question has exactly 4 options and exactly one correct option.
+    - "answer" must repeat the correct option text exactly.
+
+    OUTPUT FORMAT (STRICT JSON ONLY):
+    {{
+        "questions": [
+            {{
+                "question": "Clear, concise question text here",
+                "options": ["Option A text", "Option B text", "Option C text", "Option D text"],
+                "answer": "Option B text",
+                "explanation": "One sentence on why the answer is correct"
+            }}
+        ]
+    }}
+    """
+    model = get_gemini_model('gemini-2.5-flash')
+    response = model.generate_content(
+        prompt,
+        generation_config={"temperature": 0.9, "response_mime_type": "application/json"},
+        request_options=gemini_request_options(),
+    )
+    data = json.loads(response.text)
+    questions = data.get("questions") if isinstance(data, dict) else None
+    return questions if isinstance(questions, list) else []
+
+
+def top_up_bucket(role: str, topic: str, difficulty: str) -> int:
+    bank = get_question_bank()
+    questions = _generate_bucket_questions(role, topic, difficulty, QUESTION_BANK_TOP_UP_BATCH)
+    added = bank.add(role, topic, difficulty, questions)
+    _counters["top_ups"] += 1
+    _counters["questions_added"] += added
+    return added
+
+
+async def _top_up_in_background(role: str, topic: str, difficulty: str):
+    bucket = (normalize_text(role), normalize_text(topic), difficulty)
+    try:
+        while await asyncio.to_thread(get_question_bank().count, role, topic, difficulty) < QUESTION_BANK_MIN_PER_BUCKET:
+            if not await run_provider_call("gemini", top_up_bucket, role, topic, difficulty):
+                break
+    except Exception as e:
+        _counters["top_up_failures"] += 1
+        logger.warning("Question bank top-up for %s failed: %s", bucket, e)
+    finally:
+        _topping_up.discard(bucket)
+
+
+def schedule_top_up(role: str, topic: str, difficulty: str):
+    bucket = (normalize_text(role), normalize_text(topic), difficulty)
+    if bucket in _topping_up:
+        return
+    _topping_up.add(bucket)
+    task = asyncio.create_task(_top_up_in_background(role, topic, difficulty))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def _assemble(role: str, topics: List[str], difficulty: str, count: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    Spread count questions evenly over the requested topics, filling a thin
+    topic's share from the others. None when the bank cannot cover the
+    request or a topic with a share has no questions at all.
+    """
+    bank = get_question_bank()
+    picked: List[Dict[str, Any]] = []
+    quotas = {topic: count // len(topics) + (1 if index < count % len(topics) else 0) for index, topic in enumerate(topics)}
+    for topic in topics:
+        sampled = bank.sample(role, topic, difficulty, quotas[topic], [q["bank_id"] for q in picked])
+        if quotas[topic] and not sampled:
+            return None
+        picked.extend({**item, "topic": topic} for item in sampled)
+    for topic in topics:
+        if len(picked) >= count:
+            break
+        for item in bank.sample(role, topic, difficulty, count - len(picked), [q["bank_id"] for q in picked]):
+            picked.append({**item, "topic": topic})
+    if len(picked) < count:
+        return None
+    random.shuffle(picked)
+    bank.mark_served([q["bank_id"] for q in picked])
+    return picked
+
+
+def _group_by_topic(questions: List[Dict[str, Any]], topics: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Map generated questions onto the requested topics. Unmatched ones are
+    filed under their own topic label so their answer key is still kept.
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for item in questions:
+        if not isinstance(item, dict):
+            continue
+        label = normalize_text(item.get("topic") or "")
+        match = topics[0] if len(topics) == 1 else next(
+            (topic for topic in topics if normalize_text(topic) in label or (label and label in normalize_text(topic))),
+            None,
+        )
+        groups.setdefault(match or label or topics[0], []).append(item)
+    return groups
+
+
+def _public_question(index: int, item: Dict[str, Any], topic: str, difficulty: str) -> Dict[str, Any]:
+    return {
+        "id": index,
+        "question": item.get("question"),
+        "options": item.get("options"),
+        "topic": item.get("topic") or topic,
+        "difficulty": difficulty,
+    }
+
+
+async def build_assessment(
+    *, company: str, role_name: str, topics: str, difficulty: str, noOfQuestions: int, totalTime: int, generate
+) -> dict:
+    """
+    Assemble an assessment from the question bank, or fall back to
+    generate (the live Gemini path) when a bucket is too thin. Questions
+    from the fallback are added to the bank, and thin buckets are topped
+    up in the background either way.
+    """
+    role = (role_name or "Software Engineer").strip()
+    topic_list = split_topics(topics)
+    safe_difficulty = normalize_difficulty(difficulty)
+    num_questions = max(1, int(noOfQuestions or 5))
+
+    picked = await asyncio.to_thread(_assemble, role, topic_list, safe_difficulty, num_questions)
+    if picked is not None:
+        _counters["assembled"] += 1
+        assessment = {
+            "questions": [
+                _public_question(index, item, topic_list[0], safe_difficulty) for index, item in enumerate(picked, 1)
+            ],
+            "total_questions": num_questions,
+            "total_time_sec": totalTime,
+            "source": "bank",
+        }
+    else:
+        _counters["fallback_generations"] += 1
+        assessment = await run_provider_call(
+            "gemini", generate, company=company, role_name=role_name, topics=topics,
+            difficulty=safe_difficulty, noOfQuestions=num_questions, totalTime=totalTime,
+        )
+        if "error" in assessment:
+            return assessment
+        questions = assessment.get("questions") or []
+        for topic, items in _group_by_topic(questions, topic_list).items():
+            await asyncio.to_thread(get_question_bank().add, role, topic, safe_difficulty, items)
+        assessment["questions"] = [
+            _public_question(index, item, topic_list[0], safe_difficulty) for index, item in enumerate(questions, 1)
+        ]
+        assessment["source"] = "generated"
+
+    for topic in topic_list:
+        if await asyncio.to_thread(get_question_bank().count, role, topic, safe_difficulty) < QUESTION_BANK_MIN_PER_BUCKET:
+            schedule_top_up(role, topic, safe_difficulty)
+    return assessment
+
+
+def question_bank_stats() -> Dict[str, Any]:
+    stats = dict(_counters)
+    if _bank is not None:
+        stats.update(_bank.stats())
+    stats["topping_up"] = len(_topping_up)
+    return stats
@@ -0,0 +1,297 @@
+import contextlib
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+
+import metrics
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+RATE_LIMITING = os.getenv("RATE_LIMITING", "true").strip().lower() in {"1", "true", "yes"}
+
+# Requests and tokens per minute for each provider. A specific model can be
+# overridden with RATE_LIMITS="groq/llama-3.1-8b-instant=30:20000,...".
+PROVIDER_RATE_LIMITS: Dict[str, Tuple[int, int]] = {
+    "groq": (_env_int("GROQ_RPM", 30), _env_int("GROQ_TPM", 12000)),
+    "gemini": (_env_int("GEMINI_RPM", 1000), _env_int("GEMINI_TPM", 1000000)),
+}
+MODEL_RATE_LIMITS: Dict[str, Tuple[int, int]] = {}
+for _item in os.getenv("RATE_LIMITS", "").split(","):
+    _key, _, _limits = _item.partition("=")
+    _rpm, _, _tpm = _limits.partition(":")
+    try:
+        MODEL_RATE_LIMITS[_key.strip()] = (max(1, int(_rpm)), max(1, int(_tpm)))
+    except ValueError:
+        pass
+
+# Lower rank is served first. max_wait is how long a call may queue for
+# budget before it is shed; reserve is the share of each bucket the
+# priority may not dip into, so batch work stops before the provider's
+# limit and leaves headroom for live turns.
+PRIORITIES: Dict[str, Dict[str, float]] = {
+    "interactive": {
+        "rank": 0,
+        "max_wait": _env_float("RATE_LIMIT_INTERACTIVE_MAX_WAIT_SEC", 10.0),
+        "reserve": 0.0,
+    },
+    "normal": {
+        "rank": 1,
+        "max_wait": _env_float("RATE_LIMIT_NORMAL_MAX_WAIT_SEC", 5.0),
+        "reserve": _env_float("RATE_LIMIT_NORMAL_RESERVE", 0.1),
+    },
+    "batch": {
+        "rank": 2,
+        "max_wait": _env_float("RATE_LIMIT_BATCH_MAX_WAIT_SEC", 30.0),
+        "reserve": _env_float("RATE_LIMIT_BATCH_RESERVE", 0.25),
+    },
+}
+
+ROUTE_PRIORITIES = {
+    "/interviewer": "interactive",
+    "/chat": "interactive",
+    "/matchmaker": "interactive",
+    "/analyze": "batch",
+    "/generate/batch": "batch",
+    "/jobs": "batch",
+}
+
+# Gemini bills every image at a flat rate regardless of size.
+IMAGE_TOKENS = 258
+DEFAULT_OUTPUT_TOKENS = _env_int("RATE_LIMIT_DEFAULT_OUTPUT_TOKENS", 1024)
+
+RATE_LIMIT_WAIT = metrics.histogram(
+    "ai_engine_rate_limit_wait_seconds",
+    "Time a provider call queued for rate budget before admission",
+    ("limit", "priority"),
+)
+RATE_LIMIT_SHED = metrics.counter(
+    "ai_engine_rate_limit_shed_total",
+    "Provider calls shed instead of waiting for rate budget",
+    ("limit", "priority"),
+)
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("provider_priority", default="normal")
+
+
+def route_priority(path: str) -> str:
+    matches = [prefix for prefix in ROUTE_PRIORITIES if path.startswith(prefix)]
+    return ROUTE_PRIORITIES[max(matches, key=len)] if matches else "normal"
+
+
+def set_request_priority(priority: str) -> contextvars.Token:
+    return _priority.set(priority if priority in PRIORITIES else "normal")
+
+
+def reset_request_priority(token: contextvars.Token):
+    _priority.reset(token)
+
+
+@contextlib.contextmanager
+def request_priority(priority: str) -> Iterator[None]:
+    token = set_request_priority(priority)
+    try:
+        yield
+    finally:
+        reset_request_priority(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def estimate_tokens(text: str) -> int:
+    # Same chars/4 rule interview_memory budgets with.
+    return len(text or "") // 4 + 4
+
+
+class ProviderBusy(HTTPException):
+    """Raised when a call is shed instead of being sent over the provider's quota."""
+
+    def __init__(self, status_code: int, key: str, retry_after: float):
+        super().__init__(
+            status_code=status_code,
+            detail="AI provider is busy. Please retry shortly.",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+        )
+        self.key = key
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount: float, floor: float) -> float:
+        """Seconds until amount can be taken without dropping below floor."""
+        missing = amount + floor - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class _Limiter:
+    """Request and token buckets for one provider/model, with a priority queue of waiters."""
+
+    def __init__(self, key: str, rpm: int, tpm: int):
+        self.key = key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.condition = threading.Condition()
+        self.waiters = []
+        self.counters: Dict[str, Dict[str, float]] = {
+            name: {"admitted": 0, "deferred": 0, "shed": 0, "wait_sec_total": 0.0, "max_wait_sec": 0.0}
+            for name in PRIORITIES
+        }
+        self.tokens_admitted = 0
+        self.tokens_refunded = 0
+
+    def _wait_needed(self, cost: float, reserve: float) -> float:
+        return max(
+            self.requests.wait_for(1, reserve * self.requests.capacity),
+            self.tokens.wait_for(cost, reserve * self.tokens.capacity),
+        )
+
+    def acquire(self, cost: int, priority: str, max_wait: float) -> float:
+        settings = PRIORITIES[priority]
+        counters = self.counters[priority]
+        # A request larger than the whole bucket could never be admitted.
+        cost = min(float(cost), self.tokens.capacity * (1 - settings["reserve"]))
+        queued_at = time.monotonic()
+        deadline = queued_at + max_wait
+        ticket = (settings["rank"], next(_tickets))
+        with self.condition:
+            heapq.heappush(self.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    needed = self._wait_needed(cost, settings["reserve"])
+                    if self.waiters[0] == ticket and needed <= 0:
+                        self.requests.level -= 1
+                        self.tokens.level -= cost
+                        waited = now - queued_at
+                        counters["admitted"] += 1
+                        counters["wait_sec_total"] += waited
+                        counters["max_wait_sec"] = max(counters["max_wait_sec"], waited)
+                        if waited > 0.001:
+                            counters["deferred"] += 1
+                        self.tokens_admitted += cost
+                        RATE_LIMIT_WAIT.observe(waited, self.key, priority)
+                        return waited
+                    if now >= deadline or now + needed > deadline:
+                        counters["shed"] += 1
+                        RATE_LIMIT_SHED.inc(self.key, priority)
+                        raise ProviderBusy(503 if priority == "interactive" else 429, self.key, max(needed, 1.0))
+                    self.condition.wait(timeout=min(deadline - now, max(needed, 0.01)))
+            finally:
+                self.waiters.remove(ticket)
+                heapq.heapify(self.waiters)
+                self.condition.notify_all()
+
+    def settle(self, estimated: int, actual: int):
+        """Return over-estimated tokens once the provider reports real usage."""
+        with self.condition:
+            refund = min(float(estimated), self.tokens.capacity) - actual
+            if refund > 0:
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + refund)
+                self.tokens_refunded += refund
+                self.condition.notify_all()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.condition:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "rpm": int(self.requests.capacity),
+                "tpm": int(self.tokens.capacity),
+                "requests_available": round(self.requests.level, 2),
+                "tokens_available": round(self.tokens.level),
+                "request_budget_used": round(1 - self.requests.level / self.requests.capacity, 3),
+                "token_budget_used": round(1 - self.tokens.level / self.tokens.capacity, 3),
+                "queued": len(self.waiters),
+                "tokens_admitted": round(self.tokens_admitted),
+                "tokens_refunded": round(self.tokens_refunded),
+                "priorities": {
+                    name: {
+                        "admitted": int(counters["admitted"]),
+                        "deferred": int(counters["deferred"]),
+                        "shed": int(counters["shed"]),
+                        "avg_wait_ms": round(counters["wait_sec_total"] * 1000 / counters["admitted"], 2)
+                        if counters["admitted"] else 0.0,
+                        "max_wait_ms": round(counters["max_wait_sec"] * 1000, 2),
+                    }
+                    for name, counters in self.counters.items()
+                },
+            }
+
+
+_tickets = itertools.count()
+_limiters: Dict[str, _Limiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def _limiter(provider: str, model: str) -> _Limiter:
+    key = f"{provider}/{model}"
+    limiter = _limiters.get(key)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(key)
+            if limiter is None:
+                rpm, tpm = MODEL_RATE_LIMITS.get(key) or PROVIDER_RATE_LIMITS.get(provider, (60, 100000))
+                limiter = _Limiter(key, rpm, tpm)
+                _limiters[key] = limiter
+    return limiter
+
+
+def acquire(provider: str, model: str, cost: int, max_wait: Optional[float] = None) -> float:
+    """
+    Block until provider/model has request and token budget for a call of
+    roughly cost tokens, serving higher priorities first. Raises
+    ProviderBusy when that would take longer than the priority's max wait
+    (or max_wait, if smaller). Returns the time spent queued.
+    """
+    if not RATE_LIMITING:
+        return 0.0
+    priority = current_priority()
+    limit = PRIORITIES[priority]["max_wait"]
+    if max_wait is not None:
+        limit = max(0.0, min(limit, max_wait))
+    return _limiter(provider, model).acquire(cost, priority, limit)
+
+
+def settle(provider: str, model: str, estimated: int, actual: Optional[int]):
+    if RATE_LIMITING and actual:
+        _limiter(provider, model).settle(estimated, actual)
+
+
+def rate_limiter_stats() -> Dict[str, Any]:
+    return {
+        "enabled": RATE_LIMITING,
+        "limits": {key: limiter.snapshot() for key, limiter in sorted(_limiters.items())},
+    }
@@ -0,0 +1,64 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_counters = {"calls": 0, "coalesced": 0, "leaders": 0, "failed": 0, "abandoned": 0}
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+# Per process and per event loop: coalescing only helps while the calls
+# share a worker, which is exactly when the thundering herd happens.
+_flights: Dict[Tuple[str, str], _Flight] = {}
+
+
+def _forget(key: Tuple[str, str], flight: _Flight):
+    if _flights.get(key) is flight:
+        del _flights[key]
+    if not flight.task.cancelled() and flight.task.exception() is not None:
+        _counters["failed"] += 1
+
+
+async def coalesce(namespace: str, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+    """
+    Run factory() once for all concurrent callers with the same key and
+    give each of them the result (a deep copy, so callers can mutate it) or
+    the same exception. A caller that is cancelled only stops waiting; the
+    shared call is cancelled once every caller has gone. Nothing is kept
+    after the call finishes, so this is not a cache.
+    """
+    _counters["calls"] += 1
+    flight_key = (namespace, key)
+    flight = _flights.get(flight_key)
+    if flight is None:
+        _counters["leaders"] += 1
+        flight = _Flight(asyncio.ensure_future(factory()))
+        _flights[flight_key] = flight
+        flight.task.add_done_callback(lambda _: _forget(flight_key, flight))
+    else:
+        _counters["coalesced"] += 1
+
+    flight.waiters += 1
+    try:
+        result = await asyncio.shield(flight.task)
+    finally:
+        flight.waiters -= 1
+        if flight.waiters == 0 and not flight.task.done():
+            _counters["abandoned"] += 1
+            # Forget the flight now, not in the done callback, so a caller
+            # arriving before the task unwinds starts afresh instead of
+            # joining a call that is being cancelled.
+            if _flights.get(flight_key) is flight:
+                del _flights[flight_key]
+            flight.task.cancel()
+    return copy.deepcopy(result)
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    return {**_counters, "in_flight": len(_flights)}
@@ -0,0 +1,321 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except (TypeError, ValueError):
+        return default
+
+
+TRACE_SAMPLE_RATE = min(1.0, max(0.0, _env_float("TRACE_SAMPLE_RATE", 0.05)))
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "log").strip().lower()
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "ai-engine")
+TRACE_EXPORT_INTERVAL_SEC = _env_float("TRACE_EXPORT_INTERVAL_SEC", 2.0)
+TRACE_EXPORT_QUEUE_MAX = _env_int("TRACE_EXPORT_QUEUE_MAX", 2048)
+TRACE_MAX_SPANS = _env_int("TRACE_MAX_SPANS", 256)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("trace_span", default=None)
+
+trace_logger = logging.getLogger("ai_engine.traces")
+
+
+def _new_id(length: int) -> str:
+    return f"{random.getrandbits(length * 4):0{length}x}"
+
+
+class Trace:
+    def __init__(self, trace_id: str, request_id: str):
+        self.trace_id = trace_id
+        self.request_id = request_id
+        self.spans: List["Span"] = []
+        self.dropped_spans = 0
+        self.root_id: Optional[str] = None
+
+
+class Span:
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = _new_id(16)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._started_at = time.perf_counter()
+        self.duration_ms = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._started_at) * 1000
+        # list.append is atomic, so spans finished on worker threads need no lock.
+        if len(self.trace.spans) < TRACE_MAX_SPANS:
+            self.trace.spans.append(self)
+        else:
+            self.trace.dropped_spans += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_unix_ms": self.start_ns // 1_000_000,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            **({"error": self.error} if self.error else {}),
+        }
+
+
+class _NoopSpan:
+    def set(self, **attributes: Any):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def current_request_id() -> str:
+    return _request_id.get()
+
+
+def current_span():
+    return _current_span.get() or _NOOP
+
+
+class RequestTrace:
+    """Handle returned by start_request; the root span is None when the request is not sampled."""
+
+    def __init__(self, request_token: contextvars.Token, root: Optional[Span], span_token: Optional[contextvars.Token]):
+        self._request_token = request_token
+        self._span_token = span_token
+        self.root = root
+
+    @property
+    def traceparent(self) -> Optional[str]:
+        return f"00-{self.root.trace.trace_id}-{self.root.span_id}-01" if self.root is not None else None
+
+    def detach(self):
+        """Restore the context start_request changed; must run in that same context."""
+        if self._span_token is not None:
+            _current_span.reset(self._span_token)
+        _request_id.reset(self._request_token)
+
+    def end(self, error: Optional[BaseException] = None, **attributes: Any):
+        """Close the root span and queue the trace for export. Safe to call from any context."""
+        if self.root is None:
+            return
+        self.root.set(**attributes)
+        if error is not None:
+            self.root.error = repr(error)
+        self.root.finish()
+        _export(self.root.trace)
+
+
+def start_request(request_id: str, name: str, traceparent: str = "", force_sample: bool = False,
+                  **attributes: Any) -> RequestTrace:
+    """
+    Bind request_id to the current context and, if the request is sampled,
+    open its root span. An incoming W3C traceparent keeps the caller's
+    trace id and sampling decision.
+    """
+    request_token = _request_id.set(request_id)
+    parent = _TRACEPARENT.match((traceparent or "").strip().lower())
+    if parent:
+        sampled = force_sample or bool(int(parent.group(3), 16) & 1)
+    else:
+        sampled = force_sample or random.random() < TRACE_SAMPLE_RATE
+    if not sampled or TRACE_EXPORTER == "none":
+        return RequestTrace(request_token, None, None)
+
+    trace = Trace(parent.group(1) if parent else _new_id(32), request_id)
+    root = Span(trace, name, parent.group(2) if parent else None, {"request_id": request_id, **attributes})
+    trace.root_id = root.span_id
+    return RequestTrace(request_token, root, _current_span.set(root))
+
+
+@contextlib.contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Time a nested step of the current request. Costs one contextvar lookup
+    when the request is not sampled.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+    child = Span(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+def traced(name: str):
+    """Decorator form of span() for sync and async functions."""
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class RequestIdLogFilter(logging.Filter):
+    """Adds %(request_id)s to every log record, including ones from worker threads."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = _request_id.get()
+        return True
+
+
+# Export happens on one background thread so the request path only does a
+# non-blocking queue put; traces are dropped when the queue is full.
+_export_queue: "queue.Queue[Trace]" = queue.Queue(maxsize=TRACE_EXPORT_QUEUE_MAX)
+_exporter_thread: Optional[threading.Thread] = None
+_exporter_lock = threading.Lock()
+_counters = {"sampled": 0, "exported": 0, "dropped": 0, "export_failures": 0}
+
+
+def _export(trace: Trace):
+    _counters["sampled"] += 1
+    _ensure_exporter()
+    try:
+        _export_queue.put_nowait(trace)
+    except queue.Full:
+        _counters["dropped"] += 1
+
+
+def _ensure_exporter():
+    global _exporter_thread
+    if _exporter_thread is None:
+        with _exporter_lock:
+            if _exporter_thread is None:
+                _exporter_thread = threading.Thread(target=_export_loop, name="trace-exporter", daemon=True)
+                _exporter_thread.start()
+
+
+def _trace_record(trace: Trace) -> Dict[str, Any]:
+    return {
+        "trace_id": trace.trace_id,
+        "request_id": trace.request_id,
+        "dropped_spans": trace.dropped_spans,
+        "spans": [item.to_dict() for item in sorted(trace.spans, key=lambda item: item.start_ns)],
+    }
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_payload(traces: List[Trace]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON body (ExportTraceServiceRequest)."""
+    spans = []
+    for trace in traces:
+        for item in trace.spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": item.span_id,
+                "name": item.name,
+                # SPAN_KIND_SERVER for the request itself, INTERNAL for the steps inside it.
+                "kind": 2 if item.span_id == trace.root_id else 1,
+                "startTimeUnixNano": str(item.start_ns),
+                "endTimeUnixNano": str(item.start_ns + int(item.duration_ms * 1_000_000)),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in item.attributes.items()],
+                "status": {"code": 2, "message": item.error} if item.error else {"code": 1},
+            }
+            if item.parent_id:
+                otlp_span["parentSpanId"] = item.parent_id
+            spans.append(otlp_span)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": TRACE_SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "ai-engine.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def _flush(batch: List[Trace], http_client):
+    if TRACE_EXPORTER == "otlp":
+        response = http_client.post(TRACE_OTLP_ENDPOINT, json=_otlp_payload(batch))
+        response.raise_for_status()
+    else:
+        for trace in batch:
+            trace_logger.info(json.dumps(_trace_record(trace), default=str))
+    _counters["exported"] += len(batch)
+
+
+def _export_loop():
+    http_client = None
+    if TRACE_EXPORTER == "otlp":
+        import httpx
+
+        http_client = httpx.Client(timeout=5.0)
+    while True:
+        batch = [_export_queue.get()]
+        deadline = time.monotonic() + TRACE_EXPORT_INTERVAL_SEC
+        while len(batch) < 512:
+            try:
+                batch.append(_export_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        try:
+            _flush(batch, http_client)
+        except Exception as e:
+            _counters["export_failures"] += 1
+            logger.warning("Trace export of %d traces failed: %s", len(batch), e)
+
+
+def tracing_stats() -> Dict[str, Any]:
+    return {
+        **_counters,
+        "sample_rate": TRACE_SAMPLE_RATE,
+        "exporter": TRACE_EXPORTER,
+        "queued": _export_queue.qsize(),
+    }